@@ -2,8 +2,12 @@
 Database connection and schema management.
 Supports both PostgreSQL (production) and SQLite (local dev).
 """
+import functools
 import os
 import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
 from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 
@@ -29,6 +33,38 @@ if not USE_POSTGRES:
     BASE_DIR = Path(__file__).parent
     DB_PATH = BASE_DIR / "allergen_nutrition.db"
 
+# SQLite per-connection tuning (local dev only).
+# WAL lets readers run alongside a writer; synchronous=NORMAL is safe under WAL
+# and avoids an fsync per commit. journal_mode=WAL is persisted in the database
+# file header, so it only needs to be set once per process.
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=30000",
+)
+_SQLITE_WAL_ENABLED = False
+
+# PostgreSQL connection pools, created lazily on first use.
+# _MIGRATE_POOL is only built when DATABASE_URL_MIGRATE points at a different
+# database role; otherwise migrations share _POOL.
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "2"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+# Honour libpq's PGCONNECT_TIMEOUT instead of overriding it with a fixed value
+PG_CONNECT_TIMEOUT = int(os.getenv("PGCONNECT_TIMEOUT", "5"))
+# Server-side prepared statements on pooled connections.
+# DB_PREPARE_THRESHOLD: executions before a query is prepared (psycopg's
+# prepare_threshold), or "off" to never prepare. Prepared statements don't
+# survive PgBouncer in transaction pooling mode, so when it is unset they are
+# off for "-pooler" hosts (Neon/Render pooled URLs) and on from a query's
+# second execution otherwise.
+_DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "").strip().lower()
+PG_PREPARED_MAX = 256
+_POOL = None
+_MIGRATE_POOL = None
+_POOL_LOCK = threading.Lock()
+
 
 def normalize_pg_url(url: str) -> str:
     """
@@ -56,6 +92,38 @@ def normalize_pg_url(url: str) -> str:
     return urlunparse(new_parsed)
 
 
+def _pg_conninfo(url):
+    """Return the connection string for a PostgreSQL URL (Unix socket URLs are used as-is)."""
+    if url.startswith("postgresql:///") or url.startswith("postgres:///"):
+        return url
+    return normalize_pg_url(url)
+
+
+def _is_pg_url(url):
+    return bool(url) and (url.startswith("postgres://") or url.startswith("postgresql://"))
+
+
+# Connection strings are fixed per process, so normalize them once at import
+_RUNTIME_CONNINFO = _pg_conninfo(RUNTIME_DB_URL) if USE_POSTGRES else None
+_MIGRATE_URL = DATABASE_URL_MIGRATE or RUNTIME_DB_URL
+_MIGRATE_CONNINFO = _pg_conninfo(_MIGRATE_URL) if _is_pg_url(_MIGRATE_URL) else None
+
+
+def _tune_sqlite_conn(conn):
+    """
+    Apply SQLite PRAGMAs to a freshly opened connection.
+    Switches the database to WAL once per process, then applies the
+    per-connection settings in SQLITE_PRAGMAS.
+    """
+    global _SQLITE_WAL_ENABLED
+    if not _SQLITE_WAL_ENABLED:
+        conn.execute("PRAGMA journal_mode=WAL")
+        _SQLITE_WAL_ENABLED = True
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
 def get_conn():
     """
     Get database connection - single source of truth.
@@ -66,18 +134,13 @@ def get_conn():
     if USE_POSTGRES:
         import psycopg  # pyright: ignore[reportMissingImports]
         from psycopg.rows import dict_row  # pyright: ignore[reportMissingImports]
-        # Handle local Unix socket URLs (postgresql:/// or postgres:///) without normalization
-        if RUNTIME_DB_URL.startswith("postgresql:///") or RUNTIME_DB_URL.startswith("postgres:///"):
-            normalized_url = RUNTIME_DB_URL
-        else:
-            normalized_url = normalize_pg_url(RUNTIME_DB_URL)
-        conn = psycopg.connect(normalized_url, row_factory=dict_row, connect_timeout=5)
+        conn = psycopg.connect(_RUNTIME_CONNINFO, row_factory=dict_row, connect_timeout=PG_CONNECT_TIMEOUT)
         return conn
     else:
         # SQLite fallback (local dev only)
         conn = sqlite3.connect(str(DB_PATH))
         conn.row_factory = sqlite3.Row
-        return conn
+        return _tune_sqlite_conn(conn)
 
 
 def get_migrate_conn():
@@ -87,22 +150,104 @@ def get_migrate_conn():
     This allows migrations to use a higher-privilege role (app_migrate) while
     runtime operations use a least-privilege role (app_runtime).
     """
-    migrate_url = DATABASE_URL_MIGRATE or RUNTIME_DB_URL
-    if migrate_url and (migrate_url.startswith("postgres://") or migrate_url.startswith("postgresql://")):
+    if _MIGRATE_CONNINFO:
         import psycopg  # pyright: ignore[reportMissingImports]
         from psycopg.rows import dict_row  # pyright: ignore[reportMissingImports]
-        # Handle local Unix socket URLs (postgresql:/// or postgres:///) without normalization
-        if migrate_url.startswith("postgresql:///") or migrate_url.startswith("postgres:///"):
-            normalized_url = migrate_url
-        else:
-            normalized_url = normalize_pg_url(migrate_url)
-        conn = psycopg.connect(normalized_url, row_factory=dict_row, connect_timeout=5)
+        conn = psycopg.connect(_MIGRATE_CONNINFO, row_factory=dict_row, connect_timeout=PG_CONNECT_TIMEOUT)
         return conn
     else:
         # SQLite fallback (local dev only)
         conn = sqlite3.connect(str(DB_PATH))
         conn.row_factory = sqlite3.Row
-        return conn
+        return _tune_sqlite_conn(conn)
+
+
+def _prepare_threshold(conninfo):
+    """prepare_threshold for connections to conninfo (None disables preparing)."""
+    if _DB_PREPARE_THRESHOLD in ("off", "none", "disable", "disabled"):
+        return None
+    if _DB_PREPARE_THRESHOLD:
+        return int(_DB_PREPARE_THRESHOLD)
+    host = urlparse(conninfo).hostname or ""
+    return None if "-pooler" in host else 1
+
+
+def _configure_pooled_conn(conn):
+    # Keep more server-side prepared statements per connection than psycopg's default (100)
+    conn.prepared_max = PG_PREPARED_MAX
+
+
+def _make_pool(conninfo, min_size, max_size):
+    """
+    Open a psycopg ConnectionPool whose connections use the dict_row factory.
+    Pooled connections are long-lived, so queries are server-side prepared
+    from their second execution on (see _prepare_threshold for when not).
+    """
+    from psycopg.rows import dict_row  # pyright: ignore[reportMissingImports]
+    from psycopg_pool import ConnectionPool  # pyright: ignore[reportMissingImports]
+    return ConnectionPool(
+        conninfo,
+        min_size=min_size,
+        max_size=max_size,
+        kwargs={
+            "row_factory": dict_row,
+            "connect_timeout": PG_CONNECT_TIMEOUT,
+            "prepare_threshold": _prepare_threshold(conninfo),
+        },
+        configure=_configure_pooled_conn,
+        timeout=5,
+        open=True,
+    )
+
+
+def get_pool():
+    """
+    Get the process-wide runtime connection pool (PostgreSQL only).
+    Check connections out with `with get_pool().connection() as conn:` -
+    the connection is committed (or rolled back on error) and returned to
+    the pool when the block exits, so callers must not close it.
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = _make_pool(_RUNTIME_CONNINFO, PG_POOL_MIN, PG_POOL_MAX)
+    return _POOL
+
+
+def get_migrate_pool():
+    """
+    Get the connection pool used for schema changes (PostgreSQL only).
+    Holds a single connection for DATABASE_URL_MIGRATE; falls back to the
+    runtime pool when no separate migrate URL is configured.
+    """
+    global _MIGRATE_POOL
+    if _MIGRATE_CONNINFO == _RUNTIME_CONNINFO:
+        return get_pool()
+    if _MIGRATE_POOL is None:
+        with _POOL_LOCK:
+            if _MIGRATE_POOL is None:
+                _MIGRATE_POOL = _make_pool(_MIGRATE_CONNINFO, 1, 1)
+    return _MIGRATE_POOL
+
+
+@contextmanager
+def connection(migrate=False):
+    """
+    Context manager yielding a database connection.
+    PostgreSQL connections are checked out of the runtime (or migrate) pool and
+    returned on exit; SQLite connections are opened and closed as before.
+    """
+    if USE_POSTGRES:
+        pool = get_migrate_pool() if migrate else get_pool()
+        with pool.connection() as conn:
+            yield conn
+    else:
+        conn = get_migrate_conn() if migrate else get_conn()
+        try:
+            yield conn
+        finally:
+            conn.close()
 
 
 def row_to_dict(row, cursor=None):
@@ -112,40 +257,78 @@ def row_to_dict(row, cursor=None):
     SQLite rows need conversion from sqlite3.Row.
     """
     if isinstance(row, sqlite3.Row):
-        return {key: row[key] for key in row.keys()}
-    else:
-        # PostgreSQL rows are already dictionaries (dict_row factory)
-        return row if isinstance(row, dict) else dict(row)
+        # sqlite3.Row implements the mapping protocol, so dict() copies it in C
+        return dict(row)
+    # PostgreSQL rows are already dictionaries (dict_row factory on every connection and pool)
+    return row
+
+
+@functools.lru_cache(maxsize=512)
+def _prepare(query):
+    if USE_POSTGRES and "?" in query:
+        return query.replace("?", "%s")
+    return query
 
 
 def prepare_query(query):
     """
     Convert SQLite-style ? placeholders to PostgreSQL %s placeholders if needed.
+    Results are cached per query string, since callers pass the same SQL text on every request.
     """
-    if USE_POSTGRES and "?" in query:
-        return query.replace("?", "%s")
-    return query
+    return _prepare(query)
 
 
 def execute_query(query, params=None):
     """
     Execute a query and return results.
     Handles both SQLite (?) and PostgreSQL (%s) placeholders.
+    PostgreSQL queries run on a pooled connection instead of opening a new one.
     """
+    query = _prepare(query)
+    if USE_POSTGRES:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params or ())
+                return cursor.fetchall()
+
     conn = get_conn()
     try:
         cursor = conn.cursor()
-        # Convert ? to %s for PostgreSQL
-        if USE_POSTGRES and "?" in query:
-            query = query.replace("?", "%s")
         cursor.execute(query, params or ())
         results = cursor.fetchall()
-        conn.commit()
+        # Plain SELECTs never open a transaction, so there is nothing to commit
+        if conn.in_transaction:
+            conn.commit()
         return results
     finally:
         conn.close()
 
 
+def iter_query(query, params=None, batch_size=1000):
+    """
+    Execute a query and yield result rows one at a time.
+    Rows are fetched in batches of batch_size, so large result sets are never
+    materialized in full. On PostgreSQL a server-side (named) cursor is used,
+    so the server streams the result too.
+    The connection is held until the generator is exhausted or closed.
+    """
+    query = _prepare(query)
+    with connection() as conn:
+        if USE_POSTGRES:
+            cursor = conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        else:
+            cursor = conn.cursor()
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+
 def is_truthy(value):
     """
     Helper to interpret common truthy strings from the environment.
@@ -156,6 +339,182 @@ def is_truthy(value):
     return str(value).strip().lower() in ("1", "true", "yes", "on")
 
 
+# Environment is fixed for the life of the process, so read the flag once
+ENABLE_DB_MIGRATIONS = is_truthy(os.getenv("ENABLE_DB_MIGRATIONS", "0"))
+
+# Set once ensure_schema() has run; the schema doesn't change within a process
+_SCHEMA_READY = False
+
+
+# ── SCHEMA DDL ───────────────────────────────────────────────────────
+# Each dialect's DDL is one multi-statement script, so ensure_schema() sends
+# it in a single round trip and a single transaction.
+DDL_PG = """
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR(255) UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    active_session_token TEXT
+);
+
+-- Password reset columns (added to existing databases)
+ALTER TABLE users ADD COLUMN IF NOT EXISTS reset_token TEXT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS reset_token_expiry TEXT;
+
+-- Session validation lookups; partial so only users with a live session are indexed
+CREATE INDEX IF NOT EXISTS idx_users_active_session_token
+    ON users(active_session_token) WHERE active_session_token IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS nutrition_facts (
+    id SERIAL PRIMARY KEY,
+    ingredient VARCHAR(255) UNIQUE NOT NULL,
+    calories_per_100g REAL,
+    protein REAL,
+    carbs REAL,
+    fat REAL,
+    fiber REAL,
+    sugar REAL,
+    sodium REAL,
+    serving_size REAL,
+    vitamins TEXT,
+    minerals TEXT
+);
+
+CREATE TABLE IF NOT EXISTS saved_recipes (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    ingredients JSONB NOT NULL,
+    nutrition_summary JSONB,
+    health_goal VARCHAR(100),
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Smoothie history (auto-logged, logged-in users only)
+CREATE TABLE IF NOT EXISTS smoothie_history (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    ingredients JSONB NOT NULL,
+    nutrition_summary JSONB,
+    audience VARCHAR(50),
+    timing VARCHAR(50),
+    health_goal VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS smoothie_history_user_idx
+    ON smoothie_history(user_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS meal_plans (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    week_start DATE,
+    slots JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    plan VARCHAR(50) NOT NULL DEFAULT 'free',
+    status VARCHAR(50) NOT NULL DEFAULT 'active',
+    stripe_customer_id TEXT,
+    stripe_subscription_id TEXT,
+    current_period_end TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+DDL_SQLITE = """
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    active_session_token TEXT
+);
+
+CREATE TABLE IF NOT EXISTS nutrition_facts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ingredient TEXT UNIQUE NOT NULL,
+    calories_per_100g REAL,
+    protein REAL,
+    carbs REAL,
+    fat REAL,
+    fiber REAL,
+    sugar REAL,
+    sodium REAL,
+    serving_size REAL,
+    vitamins TEXT,
+    minerals TEXT
+);
+
+CREATE TABLE IF NOT EXISTS saved_recipes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    ingredients TEXT NOT NULL,
+    nutrition_summary TEXT,
+    health_goal TEXT,
+    notes TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Smoothie history (auto-logged, logged-in users only)
+CREATE TABLE IF NOT EXISTS smoothie_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    ingredients TEXT NOT NULL,
+    nutrition_summary TEXT,
+    audience TEXT,
+    timing TEXT,
+    health_goal TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS meal_plans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    week_start TEXT,
+    slots TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    plan TEXT NOT NULL DEFAULT 'free',
+    status TEXT NOT NULL DEFAULT 'active',
+    stripe_customer_id TEXT,
+    stripe_subscription_id TEXT,
+    current_period_end TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMIT;
+"""
+
+# Columns added to users after the original schema (migration for existing SQLite databases)
+SQLITE_USERS_ADDED_COLUMNS = (
+    ("active_session_token", "TEXT"),
+    ("reset_token", "TEXT"),
+    ("reset_token_expiry", "TEXT"),
+)
+
+
+SQLITE_USERS_SESSION_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_users_active_session_token
+    ON users(active_session_token) WHERE active_session_token IS NOT NULL
+"""
+
+
 def ensure_schema():
     """
     Create users table if it doesn't exist (idempotent).
@@ -165,211 +524,34 @@ def ensure_schema():
     
     Only executes DDL when ENABLE_DB_MIGRATIONS is truthy.
     When disabled, assumes tables already exist (production mode).
+    Runs at most once per process.
     """
+    global _SCHEMA_READY
+    
     # Prevent runtime DDL in production unless explicitly enabled
-    if not is_truthy(os.getenv("ENABLE_DB_MIGRATIONS", "0")):
+    if not ENABLE_DB_MIGRATIONS or _SCHEMA_READY:
         return
     
     # Use migrate connection for schema changes if available
-    conn = get_migrate_conn() if DATABASE_URL_MIGRATE else get_conn()
-    try:
-        cursor = conn.cursor()
-        
+    with connection(migrate=bool(DATABASE_URL_MIGRATE)) as conn:
         if USE_POSTGRES:
-            # PostgreSQL schema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id SERIAL PRIMARY KEY,
-                    email VARCHAR(255) UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    active_session_token TEXT
-                )
-            """)
+            # Multi-statement string without parameters: one round trip, one transaction
+            conn.execute(DDL_PG)
         else:
-            # SQLite schema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    active_session_token TEXT
-                )
-            """)
+            conn.executescript(DDL_SQLITE)
             
-            # Add active_session_token column if it doesn't exist (migration for existing databases)
-            try:
-                cursor.execute("ALTER TABLE users ADD COLUMN active_session_token TEXT")
-            except sqlite3.OperationalError:
-                # Column already exists, ignore
-                pass
-        
-        # Add password reset columns if they do not exist
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN reset_token TEXT")
-        except Exception:
-            pass
-        try:
-            cursor.execute("ALTER TABLE users ADD COLUMN reset_token_expiry TEXT")
-        except Exception:
-            pass
-
-        # Create nutrition_facts table for both Postgres and SQLite
-        if USE_POSTGRES:
-            # PostgreSQL schema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS nutrition_facts (
-                    id SERIAL PRIMARY KEY,
-                    ingredient VARCHAR(255) UNIQUE NOT NULL,
-                    calories_per_100g REAL,
-                    protein REAL,
-                    carbs REAL,
-                    fat REAL,
-                    fiber REAL,
-                    sugar REAL,
-                    sodium REAL,
-                    serving_size REAL,
-                    vitamins TEXT,
-                    minerals TEXT
-                )
-            """)
-        else:
-            # SQLite schema
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS nutrition_facts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ingredient TEXT UNIQUE NOT NULL,
-                    calories_per_100g REAL,
-                    protein REAL,
-                    carbs REAL,
-                    fat REAL,
-                    fiber REAL,
-                    sugar REAL,
-                    sodium REAL,
-                    serving_size REAL,
-                    vitamins TEXT,
-                    minerals TEXT
-                )
-            """)
-        
-
-        # ── SAVED RECIPES TABLE ──────────────────────────────────────────
-        if USE_POSTGRES:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS saved_recipes (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    name VARCHAR(255) NOT NULL,
-                    ingredients JSONB NOT NULL,
-                    nutrition_summary JSONB,
-                    health_goal VARCHAR(100),
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        else:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS saved_recipes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    ingredients TEXT NOT NULL,
-                    nutrition_summary TEXT,
-                    health_goal TEXT,
-                    notes TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-        # ── SMOOTHIE HISTORY TABLE (auto-logged, logged-in users only) ────
-        if USE_POSTGRES:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS smoothie_history (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    ingredients JSONB NOT NULL,
-                    nutrition_summary JSONB,
-                    audience VARCHAR(50),
-                    timing VARCHAR(50),
-                    health_goal VARCHAR(100),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS smoothie_history_user_idx
-                ON smoothie_history(user_id, created_at DESC)
-            """)
-        else:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS smoothie_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    ingredients TEXT NOT NULL,
-                    nutrition_summary TEXT,
-                    audience TEXT,
-                    timing TEXT,
-                    health_goal TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-        # ── MEAL PLANS TABLE ─────────────────────────────────────────────
-        if USE_POSTGRES:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS meal_plans (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    name VARCHAR(255) NOT NULL,
-                    week_start DATE,
-                    slots JSONB NOT NULL DEFAULT '{}',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        else:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS meal_plans (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    name TEXT NOT NULL,
-                    week_start TEXT,
-                    slots TEXT NOT NULL DEFAULT '{}',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-        # ── SUBSCRIPTIONS TABLE ──────────────────────────────────────────
-        if USE_POSTGRES:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS subscriptions (
-                    id SERIAL PRIMARY KEY,
-                    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                    plan VARCHAR(50) NOT NULL DEFAULT 'free',
-                    status VARCHAR(50) NOT NULL DEFAULT 'active',
-                    stripe_customer_id TEXT,
-                    stripe_subscription_id TEXT,
-                    current_period_end TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        else:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS subscriptions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    plan TEXT NOT NULL DEFAULT 'free',
-                    status TEXT NOT NULL DEFAULT 'active',
-                    stripe_customer_id TEXT,
-                    stripe_subscription_id TEXT,
-                    current_period_end TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+            # Add missing users columns (migration for existing databases)
+            existing = {
+                row[0] for row in conn.execute("SELECT name FROM pragma_table_info('users')")
+            }
+            for column_name, column_type in SQLITE_USERS_ADDED_COLUMNS:
+                if column_name not in existing:
+                    conn.execute(f"ALTER TABLE users ADD COLUMN {column_name} {column_type}")
+            
+            # Created after the column migration above so legacy databases have the column
+            conn.execute(SQLITE_USERS_SESSION_INDEX)
 
         # Always commit schema changes for both Postgres and SQLite
         conn.commit()
-    finally:
-        conn.close()
-
+    
+    _SCHEMA_READY = True
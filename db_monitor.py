@@ -3,11 +3,14 @@ Database health monitoring module.
 Runs periodic health checks in a background thread.
 """
 import os
+import tempfile
 import time
 import threading
 import logging
 from datetime import datetime, timezone
 
+from filelock import FileLock, Timeout
+
 # Import database connection logic
 import db
 
@@ -16,6 +19,43 @@ logger = logging.getLogger(__name__)
 # Module-level variable to store last health check result
 LAST_DB_STATUS = None
 
+# Set by stop_db_monitor() to wake the monitor thread and end the loop
+_STOP = threading.Event()
+
+# Held for the life of the process by the one worker that runs the monitor,
+# so N gunicorn workers don't each probe the database
+DB_MONITOR_LOCK_PATH = os.getenv(
+    "DB_MONITOR_LOCK_FILE", os.path.join(tempfile.gettempdir(), "db_monitor.lock")
+)
+_MONITOR_LOCK = None
+
+# Long-lived PostgreSQL connection dedicated to probes, so latency_ms measures
+# the query round trip rather than a TCP/TLS connect. Reopened after any error.
+_MONITOR_CONN = None
+_MONITOR_CONN_LOCK = threading.Lock()
+
+# How often the monitor runs SQLite maintenance (PRAGMA optimize + WAL checkpoint)
+SQLITE_MAINTENANCE_INTERVAL_SECONDS = 15 * 60
+
+
+def _get_monitor_conn():
+    global _MONITOR_CONN
+    if _MONITOR_CONN is None or _MONITOR_CONN.closed:
+        _MONITOR_CONN = db.get_conn()
+        # Autocommit so the idle connection never sits "idle in transaction"
+        _MONITOR_CONN.autocommit = True
+    return _MONITOR_CONN
+
+
+def _close_monitor_conn():
+    global _MONITOR_CONN
+    if _MONITOR_CONN is not None:
+        try:
+            _MONITOR_CONN.close()
+        except Exception:
+            pass
+        _MONITOR_CONN = None
+
 
 def probe_db():
     """
@@ -30,30 +70,32 @@ def probe_db():
         # Determine DB type
         db_type = "postgres" if db.USE_POSTGRES else "sqlite"
         
-        # Get connection (uses existing db.get_conn() with timeout)
-        conn = db.get_conn()
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            conn.close()
-            
-            latency_ms = int((time.time() - start_time) * 1000)
-            
-            return {
-                "db_type": db_type,
-                "ok": True,
-                "checked_at": checked_at,
-                "latency_ms": latency_ms,
-                "error": None
-            }
-        except Exception as e:
-            # Close connection if open
-            try:
-                conn.close()
-            except:
-                pass
-            raise e
+        if db.USE_POSTGRES:
+            # Reuse the dedicated monitor connection; drop it on failure so the next probe reconnects
+            with _MONITOR_CONN_LOCK:
+                try:
+                    cursor = _get_monitor_conn().cursor()
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                except Exception:
+                    _close_monitor_conn()
+                    raise
+        else:
+            # Opening a local SQLite file is cheap, so use a fresh connection
+            with db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        
+        latency_ms = int((time.time() - start_time) * 1000)
+        
+        return {
+            "db_type": db_type,
+            "ok": True,
+            "checked_at": checked_at,
+            "latency_ms": latency_ms,
+            "error": None
+        }
             
     except Exception as e:
         latency_ms = int((time.time() - start_time) * 1000)
@@ -71,11 +113,24 @@ def probe_db():
         }
 
 
+def _sqlite_maintenance():
+    """
+    Refresh SQLite planner statistics and checkpoint the WAL so the -wal file
+    stays bounded in long-running processes. PASSIVE never blocks readers or writers.
+    """
+    with db.connection() as conn:
+        conn.execute("PRAGMA optimize")
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
 def _monitor_loop(interval_seconds):
     """Internal monitoring loop that runs in background thread"""
     global LAST_DB_STATUS
     
-    while True:
+    maintenance_every = max(1, SQLITE_MAINTENANCE_INTERVAL_SECONDS // interval_seconds)
+    probes = 0
+    
+    while not _STOP.is_set():
         try:
             status = probe_db()
             LAST_DB_STATUS = status
@@ -97,14 +152,24 @@ def _monitor_loop(interval_seconds):
                 "error": f"Monitor exception: {str(e)}"
             }
         
-        time.sleep(interval_seconds)
+        probes += 1
+        if not db.USE_POSTGRES and probes % maintenance_every == 0:
+            try:
+                _sqlite_maintenance()
+            except Exception as e:
+                logger.warning("DB_MAINTENANCE=fail error=%s", str(e))
+        
+        _STOP.wait(interval_seconds)
 
 
 def start_db_monitor():
     """
     Start background database health monitoring thread.
     Only starts if ENABLE_DB_MONITOR=1 environment variable is set.
+    Only one process (e.g. one gunicorn worker) per host runs the monitor.
     """
+    global _MONITOR_LOCK
+    
     enable_monitor = os.getenv("ENABLE_DB_MONITOR", "0").strip()
     if enable_monitor not in ("1", "true", "yes", "on"):
         logger.info("DB_MONITOR=disabled (ENABLE_DB_MONITOR not set to 1)")
@@ -118,6 +183,16 @@ def start_db_monitor():
     except ValueError:
         interval_seconds = 60
     
+    # Only one process per host runs the monitor
+    lock = FileLock(DB_MONITOR_LOCK_PATH)
+    try:
+        lock.acquire(timeout=0)
+    except Timeout:
+        logger.info("DB_MONITOR=skipped (running in another worker) pid=%d", os.getpid())
+        return
+    _MONITOR_LOCK = lock
+    _STOP.clear()
+    
     logger.info("DB_MONITOR=starting interval_seconds=%d", interval_seconds)
     
     # Start background thread (daemon=True so it doesn't block shutdown)
@@ -130,3 +205,17 @@ def start_db_monitor():
     monitor_thread.start()
     logger.info("DB_MONITOR=started")
 
+
+def stop_db_monitor():
+    """
+    Stop the background monitoring thread.
+    The thread wakes immediately instead of finishing its sleep interval.
+    """
+    global _MONITOR_LOCK
+    _STOP.set()
+    if _MONITOR_LOCK is not None:
+        _MONITOR_LOCK.release()
+        _MONITOR_LOCK = None
+    with _MONITOR_CONN_LOCK:
+        _close_monitor_conn()
+    logger.info("DB_MONITOR=stopped")
@@ -12,6 +12,7 @@ Environment Variables:
 """
 
 import os
+import random
 from locust import HttpUser, task, between
 
 
@@ -26,6 +27,18 @@ class AnalyzeAPIUser(HttpUser):
     # Wait between 1 and 3 seconds between tasks (simulates real user behavior)
     wait_time = between(1, 3)
     
+    # Realistic ingredient combinations for testing, built once rather than per request
+    TEST_PAYLOADS = [
+        {"ingredients": ingredients}
+        for ingredients in [
+            ["banana", "spinach", "almond milk"],
+            ["strawberry", "blueberry", "greek yogurt"],
+            ["mango", "coconut milk", "chia seeds"],
+            ["apple", "kale", "oat milk"],
+            ["peach", "ginger", "soy milk"],
+        ]
+    ]
+    
     def on_start(self):
         """
         Called once when a user instance starts.
@@ -37,6 +50,9 @@ class AnalyzeAPIUser(HttpUser):
         # If the client was initialized with a different base URL, update it
         if not self.client.base_url.startswith(base_url):
             self.client.base_url = base_url.rstrip("/")
+        
+        # Every request sends JSON, so set the header once for the session
+        self.client.headers.update({"Content-Type": "application/json"})
     
     @task
     def analyze_ingredients(self):
@@ -44,23 +60,8 @@ class AnalyzeAPIUser(HttpUser):
         This is the main task that will be executed repeatedly.
         The @task decorator tells Locust to call this method.
         """
-        # Realistic ingredient combinations for testing
-        test_ingredients = [
-            ["banana", "spinach", "almond milk"],
-            ["strawberry", "blueberry", "greek yogurt"],
-            ["mango", "coconut milk", "chia seeds"],
-            ["apple", "kale", "oat milk"],
-            ["peach", "ginger", "soy milk"],
-        ]
-        
         # Rotate through different ingredient combinations
-        import random
-        ingredients = random.choice(test_ingredients)
-        
-        # Prepare the JSON payload
-        payload = {
-            "ingredients": ingredients
-        }
+        payload = random.choice(self.TEST_PAYLOADS)
         
         # Make the POST request
         # Locust automatically tracks response time, success/failure, etc.
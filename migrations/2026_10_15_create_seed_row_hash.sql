@@ -0,0 +1,8 @@
+-- Creates seed_row_hash: digests of the rows last pushed by the SQLite -> Postgres
+-- seed scripts, so re-runs skip unchanged rows (see scripts/_seed_common.py)
+CREATE TABLE IF NOT EXISTS public.seed_row_hash (
+  table_name TEXT   NOT NULL,
+  key        TEXT   NOT NULL,
+  h          BIGINT NOT NULL,
+  PRIMARY KEY (table_name, key)
+);
@@ -0,0 +1,173 @@
+"""
+Shared PostgreSQL connection pool for the ops/ and scripts/ command-line tools.
+
+Each script used to open (and close) its own psycopg connection; checking
+connections out of one pool per DSN lets steps that run back to back in the
+same process (e.g. run SQL, then verify roles) reuse a warm connection.
+"""
+import atexit
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import psycopg  # pyright: ignore[reportMissingImports]
+from psycopg_pool import ConnectionPool, PoolTimeout  # pyright: ignore[reportMissingImports]
+
+POOL_MIN = 1
+POOL_MAX = 4
+POOL_TIMEOUT = 10
+# Short per-attempt timeout; transient failures are retried with backoff
+CONNECT_TIMEOUT = 2
+CONNECT_ATTEMPTS = 3
+CONNECT_BASE_DELAY = 0.25
+
+# Shows which script owns a backend in pg_stat_activity (e.g. ops.run_sql)
+APPLICATION_NAME = f"ops.{Path(sys.argv[0]).stem or 'python'}"
+# A hung statement fails after 5 minutes, and DDL waiting on a lock after 10s
+SESSION_OPTIONS = "-c statement_timeout=300000 -c lock_timeout=10000"
+
+# Connect errors that retrying can't fix: bad credentials or a missing role
+# or database. Failed connects usually carry no sqlstate (the server's
+# message is only in the text), so the message is checked too.
+_PERMANENT_SQLSTATES = frozenset({"28P01", "28000", "3D000"})
+_PERMANENT_ERROR_RE = re.compile(
+    r'password authentication failed|role ".*" does not exist'
+    r'|database ".*" does not exist|no pg_hba\.conf entry'
+)
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+# DSN -> (event, [outcome]) while get_pool waits for a new pool's first
+# connection attempt; outcome is None on success or the connect error
+_FIRST_CONNECT = {}
+
+
+def _is_transient(error) -> bool:
+    """False for connect errors that fail the same way on every attempt."""
+    if getattr(error, "sqlstate", None) in _PERMANENT_SQLSTATES:
+        return False
+    return _PERMANENT_ERROR_RE.search(str(error)) is None
+
+
+def _connect_with_retry(connect, dsn, attempts=CONNECT_ATTEMPTS, base_delay=CONNECT_BASE_DELAY, **kwargs):
+    """
+    Call connect(dsn, **kwargs), retrying transient failures (refused or reset
+    connections, timeouts); authentication and missing-database errors are
+    raised at once. Sleeps base_delay * 2**i between attempts and re-raises
+    the last error.
+    """
+    for attempt in range(attempts):
+        try:
+            return connect(dsn, **kwargs)
+        except (psycopg.OperationalError, TimeoutError) as e:
+            if attempt == attempts - 1 or not _is_transient(e):
+                raise
+            time.sleep(base_delay * 2 ** attempt)
+
+
+def _report_first_connect(dsn, error):
+    waiter = _FIRST_CONNECT.get(dsn)
+    if waiter is not None and not waiter[0].is_set():
+        waiter[1].append(error)
+        waiter[0].set()
+
+
+class _RetryingConnection(psycopg.Connection):
+    """
+    Connection class for the pools: connect() goes through _connect_with_retry
+    and reports its outcome to a get_pool() waiting on a new pool.
+    """
+
+    @classmethod
+    def connect(cls, conninfo="", **kwargs):
+        try:
+            conn = _connect_with_retry(super().connect, conninfo, **kwargs)
+        except Exception as e:
+            _report_first_connect(conninfo, e)
+            raise
+        _report_first_connect(conninfo, None)
+        return conn
+
+
+CONNECT_KWARGS = {
+    "connect_timeout": CONNECT_TIMEOUT,
+    "application_name": APPLICATION_NAME,
+    "options": SESSION_OPTIONS,
+}
+
+
+def get_pool(dsn: str):
+    """
+    Get (opening on first use) the connection pool for a normalized DSN.
+    A new pool is only returned once its first background connection is up;
+    if that attempt fails (bad password, host, SSL...), the pool is closed and
+    the real psycopg.OperationalError is raised, rather than a PoolTimeout
+    while the pool keeps retrying behind it.
+    """
+    pool = _POOLS.get(dsn)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(dsn)
+            if pool is None:
+                ready = threading.Event()
+                outcome = []
+                _FIRST_CONNECT[dsn] = (ready, outcome)
+                try:
+                    pool = ConnectionPool(
+                        dsn,
+                        connection_class=_RetryingConnection,
+                        min_size=POOL_MIN,
+                        max_size=POOL_MAX,
+                        kwargs=CONNECT_KWARGS,
+                        timeout=POOL_TIMEOUT,
+                        open=True,
+                    )
+                    if not ready.wait(POOL_TIMEOUT):
+                        pool.close()
+                        raise PoolTimeout(f"couldn't connect within {POOL_TIMEOUT} sec")
+                    if outcome[0] is not None:
+                        pool.close()
+                        raise outcome[0]
+                finally:
+                    del _FIRST_CONNECT[dsn]
+                _POOLS[dsn] = pool
+    return pool
+
+
+@contextmanager
+def connection(dsn: str, autocommit: bool = False):
+    """
+    Context manager yielding a pooled connection for dsn.
+    The transaction is committed (or rolled back on error) and the connection
+    returned to the pool when the block exits, so callers must not close it.
+    Raises psycopg.OperationalError if the database can't be reached on first
+    use, or psycopg_pool.PoolTimeout if no connection frees up in POOL_TIMEOUT.
+    """
+    with get_pool(dsn).connection() as conn:
+        if not autocommit:
+            yield conn
+            return
+        conn.autocommit = True
+        try:
+            yield conn
+        finally:
+            # Hand the connection back in the pool's default (transactional)
+            # mode. A broken connection can't be switched back: close it so the
+            # pool discards it, without masking the caller's exception.
+            try:
+                conn.autocommit = False
+            except psycopg.Error:
+                conn.close()
+
+
+@atexit.register
+def close_pools():
+    """Close every pool opened by this process."""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+        _POOLS.clear()
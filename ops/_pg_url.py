@@ -0,0 +1,24 @@
+"""
+PostgreSQL URL normalization shared by the ops/ and scripts/ tools.
+"""
+import functools
+import re
+
+# Hosted providers whose URLs get sslmode=require when none is given
+_PROD_HOSTS = re.compile(r"amazonaws\.com|render\.com|herokuapp\.com")
+
+
+@functools.lru_cache(maxsize=8)
+def normalize_pg_url(url: str, require_ssl: bool = False) -> str:
+    """
+    Normalize PostgreSQL URL:
+    - Convert postgres:// to postgresql://
+    - Append sslmode=require if missing and the URL looks like a production
+      host (or always, when require_ssl is True)
+    DSNs are constant per process, so results are cached.
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    if "sslmode=" not in url and (require_ssl or _PROD_HOSTS.search(url)):
+        url += ("&" if "?" in url else "?") + "sslmode=require"
+    return url
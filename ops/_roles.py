@@ -0,0 +1,88 @@
+"""
+Role verification shared by ops/run_sql.py and ops/verify_roles.py.
+
+Checks that the app_runtime and app_migrate roles exist in PostgreSQL.
+"""
+import os
+import sys
+
+from ops._pg_url import normalize_pg_url
+
+try:
+    from psycopg_pool import PoolTimeout  # pyright: ignore[reportMissingImports]
+    from ops._pg import connection as pg_connection
+except ImportError:
+    print("❌ Error: psycopg (v3) is not installed.", file=sys.stderr)
+    print("   Install it with: pip install psycopg[binary,pool]", file=sys.stderr)
+    sys.exit(1)
+
+REQUIRED_ROLES = ("app_runtime", "app_migrate")
+
+# Roles found per normalized DSN, so repeated checks in one process skip the round trip
+_ROLE_CACHE = {}
+
+
+def fetch_existing_roles(conn) -> set:
+    """Return the subset of REQUIRED_ROLES that exist, in one query."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT rolname FROM pg_roles WHERE rolname = ANY(%s)",
+            (list(REQUIRED_ROLES),),
+        )
+        return {row[0] for row in cur.fetchall()}
+
+
+def verify_roles_internal(conn=None, admin_db_url: str = None) -> set:
+    """
+    Print which required roles exist and return the set of found role names.
+    Queries conn when given (e.g. run_sql_file's open connection, skipping URL
+    normalization and the cache); otherwise connects to admin_db_url or
+    ADMIN_DATABASE_URL. Exits with status 1 if the database can't be reached
+    or queried.
+    """
+    if conn is not None:
+        try:
+            found_roles = fetch_existing_roles(conn)
+        except Exception as e:
+            print(f"❌ Error verifying roles: {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        if admin_db_url is None:
+            admin_db_url = os.getenv("ADMIN_DATABASE_URL")
+            if not admin_db_url:
+                print("❌ Error: ADMIN_DATABASE_URL environment variable is not set.", file=sys.stderr)
+                sys.exit(1)
+
+        normalized_url = normalize_pg_url(admin_db_url)
+        found_roles = _ROLE_CACHE.get(normalized_url)
+        if found_roles is None:
+            try:
+                with pg_connection(normalized_url, autocommit=True) as pooled_conn:
+                    found_roles = fetch_existing_roles(pooled_conn)
+            except PoolTimeout as e:
+                print(f"❌ Error connecting to database: {e}", file=sys.stderr)
+                sys.exit(1)
+            except Exception as e:
+                print(f"❌ Error verifying roles: {e}", file=sys.stderr)
+                sys.exit(1)
+            _ROLE_CACHE[normalized_url] = found_roles
+
+    print("📋 Role Verification:")
+    print("=" * 50)
+
+    for role_name in REQUIRED_ROLES:
+        if role_name in found_roles:
+            print(f"✅ {role_name}: EXISTS")
+        else:
+            print(f"❌ {role_name}: NOT FOUND")
+
+    print("=" * 50)
+
+    if len(found_roles) == len(REQUIRED_ROLES):
+        print("✅ All required roles exist.")
+    elif found_roles:
+        print("⚠️  Only one role exists. Run the SQL file to create missing roles.")
+    else:
+        print("❌ No required roles found. Run the SQL file to create them.")
+
+    return found_roles
@@ -10,20 +10,12 @@ Environment Variables:
 """
 import os
 import sys
+from pathlib import Path
 
+# Add parent directory to path to import the shared ops helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
 
-def normalize_pg_url(url: str) -> str:
-    """
-    Normalize PostgreSQL URL:
-    - Convert postgres:// to postgresql://
-    - Append sslmode=require if missing (for production safety)
-    """
-    if url.startswith("postgres://"):
-        url = "postgresql://" + url[len("postgres://"):]
-    # Only add sslmode if not already present and if it looks like a production URL
-    if "sslmode=" not in url and ("amazonaws.com" in url or "render.com" in url or "herokuapp.com" in url):
-        url += ("&" if "?" in url else "?") + "sslmode=require"
-    return url
+from ops._roles import REQUIRED_ROLES, verify_roles_internal  # noqa: E402
 
 
 def main():
@@ -34,58 +26,9 @@ def main():
         print("   Set it to a PostgreSQL connection URL with admin privileges.", file=sys.stderr)
         sys.exit(1)
     
-    # Import psycopg
-    try:
-        import psycopg  # pyright: ignore[reportMissingImports]
-    except ImportError:
-        print("❌ Error: psycopg (v3) is not installed.", file=sys.stderr)
-        print("   Install it with: pip install psycopg[binary]", file=sys.stderr)
-        sys.exit(1)
-    
-    # Normalize and connect
-    normalized_url = normalize_pg_url(admin_db_url)
-    try:
-        conn = psycopg.connect(normalized_url, autocommit=True, connect_timeout=10)
-    except Exception as e:
-        print(f"❌ Error connecting to database: {e}", file=sys.stderr)
-        sys.exit(1)
-    
-    try:
-        with conn.cursor() as cur:
-            # Check if roles exist
-            cur.execute("""
-                SELECT rolname 
-                FROM pg_roles 
-                WHERE rolname IN ('app_runtime', 'app_migrate')
-                ORDER BY rolname
-            """)
-            found_roles = {row[0] for row in cur.fetchall()}
-            
-            print("📋 Role Verification:")
-            print("=" * 50)
-            
-            for role_name in ['app_runtime', 'app_migrate']:
-                if role_name in found_roles:
-                    print(f"✅ {role_name}: EXISTS")
-                else:
-                    print(f"❌ {role_name}: NOT FOUND")
-            
-            print("=" * 50)
-            
-            if len(found_roles) == 2:
-                print("✅ All required roles exist.")
-                sys.exit(0)
-            elif len(found_roles) == 1:
-                print("⚠️  Only one role exists. Run the SQL file to create missing roles.")
-                sys.exit(1)
-            else:
-                print("❌ No required roles found. Run the SQL file to create them.")
-                sys.exit(1)
-    except Exception as e:
-        print(f"❌ Error verifying roles: {e}", file=sys.stderr)
-        sys.exit(1)
-    finally:
-        conn.close()
+    # Check roles (exits with status 1 on connection or query errors)
+    found_roles = verify_roles_internal(admin_db_url=admin_db_url)
+    sys.exit(0 if len(found_roles) == len(REQUIRED_ROLES) else 1)
 
 
 if __name__ == "__main__":
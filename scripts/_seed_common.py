@@ -0,0 +1,100 @@
+"""
+Helpers shared by the SQLite -> Postgres seed scripts.
+
+Row digests: RowHashes records a digest of every row a seed pushes in the
+seed_row_hash table (created by migrations/2026_10_15_create_seed_row_hash.sql;
+the seeds never create it themselves), and later seeds skip rows whose digest
+is unchanged. If the table doesn't exist, every row is pushed and no digests
+are stored.
+
+The digests only describe what was last pushed, not what is in Postgres now:
+a row deleted or edited there out-of-band is not re-pushed while its SQLite
+row is unchanged. Set SEED_FORCE=1 to push every row regardless of the
+stored digests (and refresh them).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+# Set SEED_FORCE=1 to push every row even when its hash is unchanged
+SEED_FORCE = os.getenv("SEED_FORCE", "0").strip().lower() in ("1", "true", "yes", "on")
+
+# Tuned for one sequential scan per table: memory-mapped reads, a 64 MB page
+# cache, in-memory temp storage, and no writes
+SQLITE_READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+)
+
+def open_sqlite_readonly(sqlite_path):
+    """
+    Open the seed source database read-only (mode=ro URI, so no write lock
+    or journal is ever taken) with SQLITE_READ_PRAGMAS applied.
+    Rows come back as plain tuples.
+    """
+    conn = sqlite3.connect(Path(sqlite_path).resolve().as_uri() + "?mode=ro", uri=True)
+    for pragma in SQLITE_READ_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def row_hash(row) -> int:
+    """64-bit digest of a row's values, as a signed int that fits a Postgres bigint."""
+    data = json.dumps(row, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big", signed=True)
+
+
+class RowHashes:
+    """
+    Digests of the rows last seeded into one table, kept in seed_row_hash.
+
+    Loaded once per run; changed() then only yields rows that are new or
+    differ from the previous seed, and save() records their digests in the
+    caller's transaction so they commit (or roll back) with the data.
+    Without the seed_row_hash table (migration not applied), every row counts
+    as changed and save() does nothing.
+    """
+
+    def __init__(self, pg_cursor, table):
+        self.table = table
+        self.seen = 0
+        self.pending = {}
+        pg_cursor.execute("SELECT to_regclass('seed_row_hash') IS NOT NULL")
+        self.enabled = pg_cursor.fetchone()[0]
+        if not self.enabled:
+            print(f"⚠️  seed_row_hash not found; pushing every {table} row (apply the migration to skip unchanged rows)")
+            self.known = {}
+            return
+        pg_cursor.execute("SELECT key, h FROM seed_row_hash WHERE table_name = %s", (table,))
+        self.known = dict(pg_cursor.fetchall())
+
+    def changed(self, rows, key):
+        """Yield the rows whose digest differs from the stored one; key(row) identifies a row."""
+        for row in rows:
+            self.seen += 1
+            row_key = json.dumps(key(row), default=str)
+            h = row_hash(row)
+            if SEED_FORCE or self.known.get(row_key) != h:
+                self.pending[row_key] = h
+                yield row
+
+    def save(self, pg_cursor):
+        """Store the digests of the rows yielded by changed()."""
+        if not self.enabled or not self.pending:
+            return
+        pg_cursor.execute("CREATE TEMP TABLE tmp_seed_row_hash (key text, h bigint) ON COMMIT DROP")
+        with pg_cursor.copy("COPY tmp_seed_row_hash (key, h) FROM STDIN") as copy:
+            for item in self.pending.items():
+                copy.write_row(item)
+        pg_cursor.execute("""
+            INSERT INTO seed_row_hash (table_name, key, h)
+            SELECT %s, key, h FROM tmp_seed_row_hash
+            ON CONFLICT (table_name, key) DO UPDATE SET h = EXCLUDED.h
+        """, (self.table,))
+        # Several tables can be seeded in one transaction
+        pg_cursor.execute("DROP TABLE tmp_seed_row_hash")
+        self.pending.clear()
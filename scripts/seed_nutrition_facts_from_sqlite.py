@@ -4,6 +4,7 @@ Seed Postgres nutrition_facts table from local SQLite file.
 
 This script reads nutrition_facts data from the SQLite file (allergen_nutrition.db) and
 upserts it into the Postgres database. Missing columns are added automatically if needed.
+Row digests are kept in seed_row_hash, so re-runs only push rows that changed in SQLite.
 
 Usage:
     DB_URL="postgresql://..." python3 scripts/seed_nutrition_facts_from_sqlite.py
@@ -19,58 +20,137 @@ Environment variables:
     DB_URL: PostgreSQL connection URL (preferred, also checks DATABASE_URL, DATABASE_URL_RUNTIME)
     DATABASE_URL: Fallback for DB_URL if DB_URL is not set
     DATABASE_URL_RUNTIME: Additional fallback option
+    SEED_FORCE: Set to 1 to push every row, ignoring stored row digests
+        (needed to restore rows deleted from Postgres out-of-band, since their
+        digests are still stored; see scripts/_seed_common.py)
 """
+import functools
 import os
 import sys
-import sqlite3
+import traceback
+from contextlib import nullcontext
+from itertools import islice
 from pathlib import Path
 
+# Add parent directory to path to import the shared ops helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 try:
     import psycopg
-    from psycopg.rows import dict_row
+    from psycopg import sql
+    from psycopg_pool import PoolTimeout
+    from ops._pg import connection as pg_connection
+    from ops._pg_url import normalize_pg_url
+    from scripts._seed_common import RowHashes, open_sqlite_readonly
 except ImportError:
-    print("ERROR: psycopg is required. Install it with: pip install psycopg[binary]", file=sys.stderr)
+    print("ERROR: psycopg is required. Install it with: pip install psycopg[binary,pool]", file=sys.stderr)
     sys.exit(1)
 
 
-def normalize_pg_url(url: str) -> str:
-    """
-    Normalize PostgreSQL URL:
-    - Convert postgres:// to postgresql://
-    - Append sslmode=require if missing
-    """
-    if url.startswith("postgres://"):
-        url = "postgresql://" + url[len("postgres://"):]
-    if "sslmode=" not in url:
-        url += ("&" if "?" in url else "?") + "sslmode=require"
-    return url
+# Columns added to nutrition_facts if missing
+ADDED_COLUMNS = (
+    ("fiber_g", "numeric"),
+    ("sugar_g", "numeric"),
+    ("sodium_g", "numeric"),
+    ("serving_size_g", "numeric"),
+    ("vitamins", "text"),
+    ("minerals", "text"),
+)
+
+# Composed once at import rather than on every call
+ADD_COLUMNS_SQL = sql.SQL("ALTER TABLE nutrition_facts {}").format(
+    sql.SQL(", ").join(
+        sql.SQL("ADD COLUMN IF NOT EXISTS {} {}").format(sql.Identifier(column_name), sql.SQL(column_type))
+        for column_name, column_type in ADDED_COLUMNS
+    )
+)
 
 
-def ensure_columns_exist(pg_cursor, pg_conn):
+def ensure_columns_exist(pg_cursor):
     """
     Ensure required columns exist in Postgres nutrition_facts table.
     Adds columns if they don't exist (idempotent).
+    All columns are added by one ALTER TABLE (one lock acquisition, one round
+    trip) that runs in the caller's transaction, so nothing is committed until
+    the seed itself commits.
+    Inside a pipeline the ALTER has only been queued when this returns, so
+    success is reported by report_columns() once the pipeline has synced.
     """
-    columns_to_add = [
-        ("fiber_g", "numeric"),
-        ("sugar_g", "numeric"),
-        ("sodium_g", "numeric"),
-        ("serving_size_g", "numeric"),
-        ("vitamins", "text"),
-        ("minerals", "text"),
-    ]
+    pg_cursor.execute(ADD_COLUMNS_SQL)
+
+
+def report_columns():
+    """Print the columns ensure_columns_exist() added or found."""
+    for column_name, _ in ADDED_COLUMNS:
+        print(f"  ✅ Column {column_name} exists or was added")
+
+
+# Rows per multi-row INSERT ... VALUES statement
+UPSERT_BATCH_SIZE = 500
+
+# (SQLite column, Postgres column) pairs. The SELECT and the INSERT are both
+# built from this list, so SQLite rows are positional tuples already in
+# INSERT order and pass straight through.
+NUTRITION_COLUMNS = (
+    ("ingredient", "ingredient"),
+    ("calories_per_100g", "calories"),
+    ("protein", "protein_g"),
+    ("carbs", "carbs_g"),
+    ("fat", "fat_g"),
+    ("fiber", "fiber_g"),
+    ("sugar", "sugar_g"),
+    ("sodium", "sodium_g"),
+    ("serving_size", "serving_size_g"),
+    ("vitamins", "vitamins"),
+    ("minerals", "minerals"),
+)
+UPSERT_COLUMNS = tuple(pg_column for _, pg_column in NUTRITION_COLUMNS)
+SELECT_NUTRITION_FACTS = (
+    "SELECT " + ", ".join(sqlite_column for sqlite_column, _ in NUTRITION_COLUMNS)
+    + " FROM nutrition_facts"
+)
+
+
+@functools.lru_cache(maxsize=8)
+def upsert_sql(row_count):
+    """
+    The multi-row upsert statement for row_count rows. Cached: every full
+    batch has the same size, so the text is only built once per run.
+    """
+    placeholders = "(" + ", ".join(["%s"] * len(UPSERT_COLUMNS)) + ")"
+    # Note: Postgres has UNIQUE constraint/index on lower(ingredient)
+    return f"""
+        INSERT INTO nutrition_facts ({", ".join(UPSERT_COLUMNS)})
+        VALUES {", ".join([placeholders] * row_count)}
+        ON CONFLICT (lower(ingredient)) 
+        DO UPDATE SET {", ".join(f"{column} = EXCLUDED.{column}" for column in UPSERT_COLUMNS[1:])}
+    """
+
+
+def upsert_batch(pg_cursor, batch):
+    """
+    Upsert a batch of rows with one multi-row INSERT ... VALUES statement.
     
-    for column_name, column_type in columns_to_add:
-        try:
-            pg_cursor.execute(f"""
-                ALTER TABLE nutrition_facts 
-                ADD COLUMN IF NOT EXISTS {column_name} {column_type}
-            """)
-            pg_conn.commit()
-            print(f"  ✅ Column {column_name} exists or was added")
-        except Exception as e:
-            print(f"  ⚠️  Warning: Could not add column {column_name}: {e}", file=sys.stderr)
-            pg_conn.rollback()
+    ON CONFLICT DO UPDATE can't touch the same row twice in one statement, so
+    rows repeating an ingredient (case-insensitive) within the batch are
+    collapsed, keeping the last one (same result as upserting them one by one).
+    
+    The statement is prepared server-side: every full batch has the same text,
+    so Postgres parses and plans it once per run.
+    """
+    batch = list({(row[0] or "").lower(): row for row in batch}.values())
+    params = [value for row in batch for value in row]
+    pg_cursor.execute(upsert_sql(len(batch)), params, prepare=True)
+
+
+def pipeline(pg_conn):
+    """
+    Return pg_conn.pipeline() when libpq supports pipeline mode (libpq 14+),
+    otherwise a no-op context so statements run one round trip at a time.
+    """
+    if psycopg.Pipeline.is_supported():
+        return pg_conn.pipeline()
+    return nullcontext()
 
 
 def main():
@@ -98,110 +178,79 @@ def main():
     
     # Connect to SQLite
     try:
-        sqlite_conn = sqlite3.connect(str(sqlite_path))
-        sqlite_conn.row_factory = sqlite3.Row
+        # Default tuple rows: columns are consumed positionally, in SELECT order
+        sqlite_conn = open_sqlite_readonly(sqlite_path)
         sqlite_cursor = sqlite_conn.cursor()
     except Exception as e:
         print(f"ERROR: Failed to connect to SQLite: {e}", file=sys.stderr)
         sys.exit(1)
     
-    # Connect to Postgres
+    # Check a Postgres connection out of the shared pool; it is rolled back
+    # automatically if seeding fails
+    # Seeds always target a hosted database, so TLS is required unless sslmode is given
+    normalized_url = normalize_pg_url(pg_url, require_ssl=True)
     try:
-        normalized_url = normalize_pg_url(pg_url)
-        pg_conn = psycopg.connect(normalized_url, row_factory=dict_row, connect_timeout=10)
-        pg_cursor = pg_conn.cursor()
-    except Exception as e:
+        with pg_connection(normalized_url) as pg_conn:
+            pg_cursor = pg_conn.cursor()
+            
+            # Digests of the rows pushed by the previous seed (needs a result, so
+            # it runs before the pipeline)
+            hashes = RowHashes(pg_cursor, "nutrition_facts")
+            
+            # Pipeline the ALTER and the upserts: statements are sent without
+            # waiting for each result, and errors surface when the block exits
+            with pipeline(pg_conn):
+                # Ensure required columns exist in Postgres table
+                ensure_columns_exist(pg_cursor)
+                
+                # Read nutrition_facts from SQLite
+                sqlite_cursor.execute(SELECT_NUTRITION_FACTS)
+                
+                # Stream new/changed rows in batches so only one batch is held in
+                # memory; rows are already in UPSERT_COLUMNS order
+                changed = hashes.changed(sqlite_cursor, key=lambda row: (row[0] or "").lower())
+                upserted = 0
+                while True:
+                    batch = list(islice(changed, UPSERT_BATCH_SIZE))
+                    if not batch:
+                        break
+                    # Upsert with ON CONFLICT DO UPDATE, one statement per batch
+                    upsert_batch(pg_cursor, batch)
+                    upserted += len(batch)
+            
+            # The pipeline has synced, so the ALTER is known to have succeeded
+            print("\n=== Ensuring Postgres columns exist ===")
+            report_columns()
+            print("\n=== nutrition_facts ===")
+            
+            # COPY can't run in a pipeline, so digests are stored afterwards
+            hashes.save(pg_cursor)
+            found = hashes.seen
+            print(f"Found {found} rows in SQLite")
+            
+            if not found:
+                print("No rows to migrate")
+                pg_conn.commit()
+                return
+            
+            # Single commit for the column changes and the upsert
+            pg_conn.commit()
+            
+            # Inserts and updates both count towards rowcount, so report the number attempted
+            print(f"✅ Upserted {upserted} rows (new inserts + updates), skipped {found - upserted} unchanged")
+            print(f"   (Postgres rowcount may vary; re-run to verify all rows are present)")
+            
+            print("\n✅ Seeding completed successfully!")
+            
+    except PoolTimeout as e:
         print(f"ERROR: Failed to connect to Postgres: {e}", file=sys.stderr)
-        sqlite_conn.close()
         sys.exit(1)
-    
-    try:
-        # Ensure required columns exist in Postgres table
-        print("\n=== Ensuring Postgres columns exist ===")
-        ensure_columns_exist(pg_cursor, pg_conn)
-        
-        # Read nutrition_facts from SQLite
-        print("\n=== nutrition_facts ===")
-        sqlite_cursor.execute("""
-            SELECT 
-                ingredient,
-                calories_per_100g,
-                protein,
-                carbs,
-                fat,
-                fiber,
-                sugar,
-                sodium,
-                serving_size,
-                vitamins,
-                minerals
-            FROM nutrition_facts
-        """)
-        rows = sqlite_cursor.fetchall()
-        print(f"Found {len(rows)} rows in SQLite")
-        
-        if not rows:
-            print("No rows to migrate")
-            return
-        
-        # Convert SQLite rows to tuples for executemany
-        data = []
-        for row in rows:
-            data.append((
-                row['ingredient'],
-                row['calories_per_100g'],
-                row['protein'],
-                row['carbs'],
-                row['fat'],
-                row['fiber'],
-                row['sugar'],
-                row['sodium'],
-                row['serving_size'],
-                row['vitamins'],
-                row['minerals']
-            ))
-        
-        print(f"Attempting to upsert {len(data)} rows into Postgres...")
-        
-        # Upsert with ON CONFLICT DO UPDATE
-        # Note: Postgres has UNIQUE constraint/index on lower(ingredient)
-        # If using expression-based unique index, may need ON CONFLICT ON CONSTRAINT constraint_name instead
-        pg_cursor.executemany("""
-            INSERT INTO nutrition_facts 
-            (ingredient, calories, protein_g, carbs_g, fat_g, 
-             fiber_g, sugar_g, sodium_g, serving_size_g, vitamins, minerals)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (lower(ingredient)) 
-            DO UPDATE SET
-                calories = EXCLUDED.calories,
-                protein_g = EXCLUDED.protein_g,
-                carbs_g = EXCLUDED.carbs_g,
-                fat_g = EXCLUDED.fat_g,
-                fiber_g = EXCLUDED.fiber_g,
-                sugar_g = EXCLUDED.sugar_g,
-                sodium_g = EXCLUDED.sodium_g,
-                serving_size_g = EXCLUDED.serving_size_g,
-                vitamins = EXCLUDED.vitamins,
-                minerals = EXCLUDED.minerals
-        """, data)
-        pg_conn.commit()
-        
-        # Note: executemany returns rowcount for the last executed statement only
-        # So we report the number attempted
-        print(f"✅ Upserted {len(data)} rows (new inserts + updates)")
-        print(f"   (Postgres rowcount may vary; re-run to verify all rows are present)")
-        
-        print("\n✅ Seeding completed successfully!")
-        
     except Exception as e:
         print(f"\nERROR: Failed to seed data: {e}", file=sys.stderr)
-        import traceback
         traceback.print_exc()
-        pg_conn.rollback()
         sys.exit(1)
     finally:
         sqlite_conn.close()
-        pg_conn.close()
 
 
 if __name__ == "__main__":
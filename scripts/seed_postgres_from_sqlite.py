@@ -3,7 +3,9 @@
 Seed Postgres database from local SQLite file.
 
 This script reads data from the SQLite file (allergen_nutrition.db) and inserts it
-into the Postgres database. It uses ON CONFLICT DO NOTHING to make it safe to re-run.
+into the Postgres database. Rows are bulk-loaded with COPY into a temp table and
+merged with ON CONFLICT DO NOTHING, so it is safe to re-run. Row digests are
+kept in seed_row_hash, so re-runs only push rows that changed in SQLite.
 
 Usage:
     DB_URL="postgresql://..." python3 scripts/seed_postgres_from_sqlite.py
@@ -15,31 +17,104 @@ Environment variables:
     SQLITE_PATH: Path to SQLite database file (default: "allergen_nutrition.db")
     DB_URL: PostgreSQL connection URL (required, also checks DATABASE_URL)
     DATABASE_URL: Fallback for DB_URL if DB_URL is not set
+    SEED_FORCE: Set to 1 to push every row, ignoring stored row digests
+        (needed to restore rows deleted from Postgres out-of-band, since their
+        digests are still stored; see scripts/_seed_common.py)
 """
 import os
 import sys
-import sqlite3
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Add parent directory to path to import the shared ops helpers
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 try:
-    import psycopg
-    from psycopg.rows import dict_row
+    from psycopg_pool import PoolTimeout
+    from ops._pg import connection as pg_connection
+    from ops._pg_url import normalize_pg_url
+    from scripts._seed_common import RowHashes, open_sqlite_readonly
 except ImportError:
-    print("ERROR: psycopg is required. Install it with: pip install psycopg[binary]", file=sys.stderr)
+    print("ERROR: psycopg is required. Install it with: pip install psycopg[binary,pool]", file=sys.stderr)
     sys.exit(1)
 
 
-def normalize_pg_url(url: str) -> str:
+# Tables copied from SQLite, with the unique key used for ON CONFLICT DO NOTHING
+TABLES = [
+    {
+        "table": "ingredient_categories",
+        "columns": ("ingredient", "category", "subcategory", "health_benefits", "key_nutrients", "description"),
+        "conflict": ("ingredient", "category", "subcategory"),
+    },
+    {
+        "table": "health_specific_serving_sizes",
+        "columns": ("ingredient", "health_benefit", "nutrient_category", "serving_size", "serving_description", "description"),
+        "conflict": ("ingredient", "health_benefit", "nutrient_category"),
+    },
+    {
+        "table": "allergens",
+        "columns": ("name", "aliases", "severity", "description", "common_in"),
+        "conflict": ("name",),
+    },
+]
+
+
+def copy_table(sqlite_cursor, pg_cursor, spec):
+    """
+    Copy one table from SQLite into Postgres.
+    
+    Rows are streamed from the SQLite cursor into a temp table with COPY, then
+    merged into the target with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+    The temp table only has the copied columns (no serial defaults), and is
+    dropped at commit.
+    Rows whose digest matches the previous seed (see RowHashes) are skipped.
+    
+    Returns:
+        (rows found in SQLite, rows inserted into Postgres)
+    """
+    table = spec["table"]
+    columns = ", ".join(spec["columns"])
+    conflict = ", ".join(spec["conflict"])
+    tmp_table = f"tmp_{table}"
+    
+    key_indexes = [spec["columns"].index(column) for column in spec["conflict"]]
+    
+    hashes = RowHashes(pg_cursor, table)
+    sqlite_cursor.execute(f"SELECT {columns} FROM {table}")
+    
+    pg_cursor.execute(f"CREATE TEMP TABLE {tmp_table} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+    with pg_cursor.copy(f"COPY {tmp_table} ({columns}) FROM STDIN") as copy:
+        for row in hashes.changed(sqlite_cursor, key=lambda row: [row[i] for i in key_indexes]):
+            copy.write_row(row)
+    
+    pg_cursor.execute(f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM {tmp_table}
+        ON CONFLICT ({conflict}) DO NOTHING
+    """)
+    inserted = pg_cursor.rowcount
+    hashes.save(pg_cursor)
+    return hashes.seen, inserted
+
+
+def load_table(dsn, sqlite_path, spec):
     """
-    Normalize PostgreSQL URL:
-    - Convert postgres:// to postgresql://
-    - Append sslmode=require if missing
+    Load one table in its own transaction, on its own SQLite and Postgres
+    connections (SQLite connections can't be shared across threads).
+    The Postgres transaction is rolled back if the load fails.
+    
+    Returns:
+        (table name, rows found in SQLite, rows inserted into Postgres)
     """
-    if url.startswith("postgres://"):
-        url = "postgresql://" + url[len("postgres://"):]
-    if "sslmode=" not in url:
-        url += ("&" if "?" in url else "?") + "sslmode=require"
-    return url
+    # Default tuple rows: columns are consumed positionally, in SELECT order
+    sqlite_conn = open_sqlite_readonly(sqlite_path)
+    try:
+        with pg_connection(dsn) as pg_conn:
+            found, inserted = copy_table(sqlite_conn.cursor(), pg_conn.cursor(), spec)
+        return spec["table"], found, inserted
+    finally:
+        sqlite_conn.close()
 
 
 def main():
@@ -65,134 +140,30 @@ def main():
     print(f"Reading from SQLite: {sqlite_path}")
     print(f"Writing to Postgres: {pg_url.split('@')[1] if '@' in pg_url else '***'}")
     
-    # Connect to SQLite
-    try:
-        sqlite_conn = sqlite3.connect(str(sqlite_path))
-        sqlite_conn.row_factory = sqlite3.Row
-        sqlite_cursor = sqlite_conn.cursor()
-    except Exception as e:
-        print(f"ERROR: Failed to connect to SQLite: {e}", file=sys.stderr)
-        sys.exit(1)
-    
-    # Connect to Postgres
-    try:
-        normalized_url = normalize_pg_url(pg_url)
-        pg_conn = psycopg.connect(normalized_url, row_factory=dict_row, connect_timeout=10)
-        pg_cursor = pg_conn.cursor()
-    except Exception as e:
-        print(f"ERROR: Failed to connect to Postgres: {e}", file=sys.stderr)
-        sqlite_conn.close()
-        sys.exit(1)
-    
+    # Seeds always target a hosted database, so TLS is required unless sslmode is given
+    normalized_url = normalize_pg_url(pg_url, require_ssl=True)
     try:
-        # Table 1: ingredient_categories
-        print("\n=== ingredient_categories ===")
-        sqlite_cursor.execute("""
-            SELECT ingredient, category, subcategory, health_benefits, key_nutrients, description
-            FROM ingredient_categories
-        """)
-        rows = sqlite_cursor.fetchall()
-        print(f"Found {len(rows)} rows in SQLite")
-        
-        if rows:
-            # Convert SQLite rows to tuples for executemany
-            data = []
-            for row in rows:
-                data.append((
-                    row['ingredient'],
-                    row['category'],
-                    row['subcategory'],
-                    row['health_benefits'],
-                    row['key_nutrients'],
-                    row['description']
-                ))
-            
-            # Insert with ON CONFLICT DO NOTHING
-            pg_cursor.executemany("""
-                INSERT INTO ingredient_categories 
-                (ingredient, category, subcategory, health_benefits, key_nutrients, description)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ingredient, category, subcategory) DO NOTHING
-            """, data)
-            pg_conn.commit()
-            inserted = pg_cursor.rowcount
-            skipped = len(data) - inserted
-            print(f"Inserted {inserted} rows, skipped {skipped} (already exist)")
-        
-        # Table 2: health_specific_serving_sizes
-        print("\n=== health_specific_serving_sizes ===")
-        sqlite_cursor.execute("""
-            SELECT ingredient, health_benefit, nutrient_category, serving_size, serving_description, description
-            FROM health_specific_serving_sizes
-        """)
-        rows = sqlite_cursor.fetchall()
-        print(f"Found {len(rows)} rows in SQLite")
-        
-        if rows:
-            data = []
-            for row in rows:
-                data.append((
-                    row['ingredient'],
-                    row['health_benefit'],
-                    row['nutrient_category'],
-                    row['serving_size'],
-                    row['serving_description'],
-                    row['description']
-                ))
-            
-            pg_cursor.executemany("""
-                INSERT INTO health_specific_serving_sizes
-                (ingredient, health_benefit, nutrient_category, serving_size, serving_description, description)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (ingredient, health_benefit, nutrient_category) DO NOTHING
-            """, data)
-            pg_conn.commit()
-            inserted = pg_cursor.rowcount
-            skipped = len(data) - inserted
-            print(f"Inserted {inserted} rows, skipped {skipped} (already exist)")
-        
-        # Table 3: allergens
-        print("\n=== allergens ===")
-        sqlite_cursor.execute("""
-            SELECT name, aliases, severity, description, common_in
-            FROM allergens
-        """)
-        rows = sqlite_cursor.fetchall()
-        print(f"Found {len(rows)} rows in SQLite")
-        
-        if rows:
-            data = []
-            for row in rows:
-                data.append((
-                    row['name'],
-                    row['aliases'],
-                    row['severity'],
-                    row['description'],
-                    row['common_in']
-                ))
-            
-            pg_cursor.executemany("""
-                INSERT INTO allergens
-                (name, aliases, severity, description, common_in)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (name) DO NOTHING
-            """, data)
-            pg_conn.commit()
-            inserted = pg_cursor.rowcount
-            skipped = len(data) - inserted
-            print(f"Inserted {inserted} rows, skipped {skipped} (already exist)")
+        # The tables are independent, so load them concurrently; each worker
+        # commits its own table
+        with ThreadPoolExecutor(max_workers=len(TABLES)) as executor:
+            futures = [executor.submit(load_table, normalized_url, sqlite_path, spec) for spec in TABLES]
+            for future in as_completed(futures):
+                table, found, inserted = future.result()
+                print(f"\n=== {table} ===")
+                print(f"Found {found} rows in SQLite")
+                if found:
+                    skipped = found - inserted
+                    print(f"Inserted {inserted} rows, skipped {skipped} (already exist or unchanged)")
         
         print("\n✅ Seeding completed successfully!")
         
+    except PoolTimeout as e:
+        print(f"ERROR: Failed to connect to Postgres: {e}", file=sys.stderr)
+        sys.exit(1)
     except Exception as e:
         print(f"\nERROR: Failed to seed data: {e}", file=sys.stderr)
-        import traceback
         traceback.print_exc()
-        pg_conn.rollback()
         sys.exit(1)
-    finally:
-        sqlite_conn.close()
-        pg_conn.close()
 
 
 if __name__ == "__main__":
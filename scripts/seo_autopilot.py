@@ -4,24 +4,37 @@ SEO Autopilot
 
 Goal:
 - Automatically keep data/seo_goal_enrichment.json "good enough" for new goals/ingredients.
-- Then run scripts/seo_enrich_goals.py --write to push keywords into data/goals.json.
+- Then run scripts/seo_enrich_goals.py (in-process) to push keywords into data/goals.json.
 
 Usage:
   python3 scripts/seo_autopilot.py
   python3 scripts/seo_autopilot.py --write
+  python3 scripts/seo_autopilot.py --write --force   # after hand-editing the enrichment config
+
+A full --write run repeats until enrichment stops changing goals.json, then
+stamps the config with the mtimes of goals.json and ingredients.json; later
+runs exit early while both are unchanged.
 """
 
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import re
-import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Set, Tuple
 
+try:
+    # Optional C parser, used for reads only: files are always written by the
+    # stdlib json, whose output (float repr, escaping) orjson doesn't match
+    import orjson
+except ImportError:
+    orjson = None
+
 # Ensure project root is on sys.path so `import utils.*` works when running from scripts/
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
@@ -29,6 +42,8 @@ if str(ROOT) not in sys.path:
 
 
 ENRICH_PATH = Path("data/seo_goal_enrichment.json")
+GOALS_PATH = Path("data/goals.json")
+INGREDIENTS_PATH = Path("data/ingredients.json")
 
 # Heuristic: cluster -> candidate ingredient slugs (only use ones that exist as ingredient pages)
 CLUSTER_INGREDIENTS = {
@@ -53,6 +68,15 @@ CLUSTER_TRIGGERS = {
     ],
 }
 
+# Stable output order for picked clusters
+CLUSTER_ORDER = ("heart_support", "anti_inflammation", "metabolic_balance")
+
+# trigger -> clusters it selects, built once at import
+_TRIGGER_CLUSTERS: Dict[str, Tuple[str, ...]] = {}
+for _cluster, _triggers in CLUSTER_TRIGGERS.items():
+    for _t in _triggers:
+        _TRIGGER_CLUSTERS[_t] = _TRIGGER_CLUSTERS.get(_t, ()) + (_cluster,)
+
 # Heuristic: ingredient names/synonyms -> ingredient slug
 ING_SYNONYMS = {
     "chia seed": "chia-seed",
@@ -64,13 +88,16 @@ ING_SYNONYMS = {
 
 
 def load_json(path: Path) -> dict:
-    return json.loads(path.read_text(encoding="utf-8"))
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_bytes())
 
 
 def save_json(path: Path, obj: dict) -> None:
     path.write_text(json.dumps(obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
 
+@functools.lru_cache(maxsize=8192)
 def normalize_text(s: str) -> str:
     return re.sub(r"\s+", " ", (s or "").strip().lower())
 
@@ -88,69 +115,88 @@ def ensure_goal_map_shape(g: dict) -> dict:
 
 
 def unique_extend(lst: List[str], items: List[str]) -> int:
-    before = len(lst)
+    """Append the items not already in lst (first occurrence wins); returns how many were added."""
     seen = set(lst)
-    for x in items:
-        if x and x not in seen:
-            lst.append(x)
-            seen.add(x)
-    return len(lst) - before
-
-
-def pick_clusters(goal_name: str, goal_slug: str, keywords: List[str]) -> List[str]:
-    hay = " | ".join([goal_name, goal_slug] + keywords)
-    hay = normalize_text(hay)
-
-    picked: List[str] = []
-    for cluster, triggers in CLUSTER_TRIGGERS.items():
-        for t in triggers:
-            if t in hay:
-                picked.append(cluster)
-                break
+    # dict.fromkeys dedupes items in order at C level
+    added = [x for x in dict.fromkeys(items) if x and x not in seen]
+    lst.extend(added)
+    return len(added)
 
-    # fallback: always at least metabolic_balance (safe default for smoothie SEO)
-    if not picked:
-        picked = ["metabolic_balance"]
 
-    # stable order (no randomness)
-    order = ["heart_support", "anti_inflammation", "metabolic_balance"]
-    picked_sorted = [c for c in order if c in set(picked)]
-    return picked_sorted
+class PhraseScanner:
+    """
+    Finds which of a fixed set of phrases occur (as substrings) in a text, in
+    one pass of a single compiled regex instead of one `in` scan per phrase.
+
+    Built once per run from ingredient phrases, synonyms and cluster triggers.
+    The pattern is a lookahead so matches may overlap; at each position the
+    alternation (longest phrase first) reports the longest phrase, and any
+    shorter phrase starting there is a prefix of it, so each phrase also
+    records which other phrases are its prefixes.
+    """
+
+    def __init__(self, phrases: Set[str]):
+        keys = sorted((p for p in phrases if p), key=len, reverse=True)
+        self._rx = re.compile("(?=(" + "|".join(re.escape(p) for p in keys) + "))") if keys else None
+        key_set = set(keys)
+        self._prefixes: Dict[str, Tuple[str, ...]] = {
+            p: tuple(p[:n] for n in range(1, len(p) + 1) if p[:n] in key_set) for p in keys
+        }
+
+    def matches(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        if self._rx is None:
+            return found
+        for m in self._rx.finditer(text):
+            found.update(self._prefixes[m.group(1)])
+        return found
 
 
-def pick_ingredients_from_text(text: str, existing_ingredient_slugs: Set[str]) -> List[str]:
-    t = normalize_text(text)
-    hits: List[str] = []
+def build_ingredient_phrases(existing_ingredient_slugs: Set[str]) -> Tuple[Tuple[str, str], ...]:
+    """
+    (phrase, slug) pairs to look for in goal text, built once per run:
+    each slug as words (sorted by slug), then synonyms of existing slugs.
+    """
+    direct = tuple((slug.replace("-", " "), slug) for slug in sorted(existing_ingredient_slugs))
+    synonyms = tuple((k, slug) for k, slug in ING_SYNONYMS.items() if slug in existing_ingredient_slugs)
+    return direct + synonyms
+
+
+def build_goal_scanner(ingredient_phrases: Tuple[Tuple[str, str], ...]) -> PhraseScanner:
+    phrases = {phrase for phrase, _ in ingredient_phrases}
+    phrases.update(_TRIGGER_CLUSTERS)
+    return PhraseScanner(phrases)
+
+
+def pick_clusters(matched: Set[str]) -> List[str]:
+    """Clusters whose triggers are in `matched` (the phrases found in the goal text)."""
+    picked = {cluster for t in matched for cluster in _TRIGGER_CLUSTERS.get(t, ())}
 
-    # direct slug mentions
-    for slug in sorted(existing_ingredient_slugs):
-        if slug.replace("-", " ") in t:
-            hits.append(slug)
+    # fallback: always at least metabolic_balance (safe default for smoothie SEO)
+    if not picked:
+        picked = {"metabolic_balance"}
+
+    # stable order (no randomness)
+    return [c for c in CLUSTER_ORDER if c in picked]
 
-    # synonyms
-    for k, slug in ING_SYNONYMS.items():
-        if k in t and slug in existing_ingredient_slugs:
-            hits.append(slug)
 
-    # unique, keep order
-    out: List[str] = []
-    seen: Set[str] = set()
-    for x in hits:
-        if x not in seen:
-            out.append(x)
-            seen.add(x)
-    return out
+def pick_ingredients_from_text(matched: Set[str], ingredient_phrases: Tuple[Tuple[str, str], ...]) -> List[str]:
+    """Ingredient slugs mentioned in the goal text, given the phrases found in it."""
+    # direct slug mentions, then synonyms; unique, keep order
+    return list(dict.fromkeys(slug for phrase, slug in ingredient_phrases if phrase in matched))
 
 
 def pick_ingredients_from_clusters(clusters: List[str], existing_ingredient_slugs: Set[str], limit: int = 8) -> List[str]:
-    out: List[str] = []
+    # dict keys: ordered, with O(1) "already picked" checks
+    out: Dict[str, None] = {}
     for c in clusters:
-        for slug in CLUSTER_INGREDIENTS.get(c, []):
-            if slug in existing_ingredient_slugs and slug not in out:
-                out.append(slug)
-            if len(out) >= limit:
-                return out
-    return out
+        for slug in CLUSTER_INGREDIENTS.get(c, ()):
+            if slug in existing_ingredient_slugs:
+                out[slug] = None
+                # The count only grows here, so this is the only place to check it
+                if len(out) >= limit:
+                    return list(out)
+    return list(out)
 
 
 def apply_ingredient_clusters_to_goals(cfg: dict, goals_reg: dict, ings_reg: dict) -> bool:
@@ -200,21 +246,63 @@ def apply_ingredient_clusters_to_goals(cfg: dict, goals_reg: dict, ings_reg: dic
     return changed
 
 
+def source_mtimes() -> Dict[str, int]:
+    """mtimes (ns) of the registries autopilot derives the config from."""
+    return {"goals": GOALS_PATH.stat().st_mtime_ns, "ingredients": INGREDIENTS_PATH.stat().st_mtime_ns}
+
+
+# Upper bound on autopilot passes in one --write run (see main)
+MAX_PASSES = 5
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--write", action="store_true", help="write changes + run seo_enrich_goals.py --write")
     ap.add_argument("--limit", type=int, default=0, help="optional: limit how many goals to update (0 = no limit)")
+    ap.add_argument("--force", action="store_true", help="run even if goals.json/ingredients.json are unchanged since the last --write")
     args = ap.parse_args()
 
+    # Enrichment adds keywords to goals.json, which can make new clusters and
+    # ingredients match; passes repeat until goals.json stops changing, so the
+    # run ends with a config stamped with its final mtimes
+    for _ in range(MAX_PASSES):
+        rc, goals_rewritten = autopilot_pass(args)
+        if not goals_rewritten:
+            break
+        print("\ngoals.json was updated; re-running autopilot on it.\n")
+    return rc
+
+
+def autopilot_pass(args: argparse.Namespace) -> Tuple[int, bool]:
+    """
+    One derive (+ write and enrich) pass.
+    Returns (exit code, whether enrichment rewrote goals.json).
+    """
     if not ENRICH_PATH.exists():
         print(f"ERROR: missing {ENRICH_PATH}")
-        return 2
+        return 2, False
+
+    cfg = load_json(ENRICH_PATH)
+    cfg.setdefault("version", 1)
+    cfg.setdefault("defaults", {"ingredient_bucket": "related", "max_primary": 12, "max_related": 18})
+    cfg.setdefault("clusters", {})
+    cfg.setdefault("goal_map", {})
+
+    # Nothing to derive if the registries haven't changed since the last full --write
+    mtimes = source_mtimes()
+    if not args.force and cfg.get("_source_mtimes") == mtimes:
+        print("Up to date: goals.json and ingredients.json unchanged since the last run (use --force to re-run).")
+        return 0, False
 
     # Import registries from your app utils (same pattern you already use)
     from utils.seo_registry import get_goals_registry, get_ingredients_registry  # noqa
 
-    goals_reg = get_goals_registry()
-    ingredients_reg = get_ingredients_registry()
+    # Independent files: read both at once
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        goals_future = ex.submit(get_goals_registry)
+        ingredients_future = ex.submit(get_ingredients_registry)
+        goals_reg = goals_future.result()
+        ingredients_reg = ingredients_future.result()
 
     existing_ing_slugs: Set[str] = set()
     for ing in ingredients_reg.get("ingredients", []):
@@ -222,14 +310,12 @@ def main() -> int:
         if slug:
             existing_ing_slugs.add(slug)
 
-    cfg = load_json(ENRICH_PATH)
-    cfg.setdefault("version", 1)
-    cfg.setdefault("defaults", {"ingredient_bucket": "related", "max_primary": 12, "max_related": 18})
-    cfg.setdefault("clusters", {})
-    cfg.setdefault("goal_map", {})
-
     goal_map: Dict[str, dict] = cfg["goal_map"]
 
+    # One scanner for ingredient phrases, synonyms and cluster triggers
+    ingredient_phrases = build_ingredient_phrases(existing_ing_slugs)
+    scanner = build_goal_scanner(ingredient_phrases)
+
     clusters_changed = apply_ingredient_clusters_to_goals(cfg, goals_reg, ingredients_reg)
 
     touched = 0
@@ -242,7 +328,8 @@ def main() -> int:
             continue
 
         gm = ensure_goal_map_shape(goal_map.get(slug, {}))
-        before = json.dumps(gm, sort_keys=True)
+        # Number of items appended to gm's lists; the entry changed iff > 0
+        added = 0
 
         # Collect keywords from the goal registry entry
         kws: List[str] = []
@@ -252,21 +339,26 @@ def main() -> int:
         kws = [normalize_text(x) for x in kws if isinstance(x, str)]
 
         name = g.get("name") or ""
+        # Scan name/slug/keywords once for every known phrase. kws are already
+        # normalized, so only name and slug go through (cached) normalize_text
+        # instead of re-normalizing the whole joined blob
+        text_blob = " | ".join((normalize_text(name), normalize_text(slug), *kws))
+        matched = scanner.matches(text_blob)
+
         # Clusters
-        clusters = pick_clusters(name, slug, kws)
-        unique_extend(gm["clusters"], clusters)
+        clusters = pick_clusters(matched)
+        added += unique_extend(gm["clusters"], clusters)
 
         # Ingredients:
         # 1) from text keywords/name/slug
-        text_blob = " | ".join([name, slug] + kws)
-        ing_from_text = pick_ingredients_from_text(text_blob, existing_ing_slugs)
+        ing_from_text = pick_ingredients_from_text(matched, ingredient_phrases)
 
         # 2) from cluster candidates
         ing_from_clusters = pick_ingredients_from_clusters(gm["clusters"], existing_ing_slugs, limit=8)
 
         # Merge
-        unique_extend(gm["ingredients"], ing_from_text)
-        unique_extend(gm["ingredients"], ing_from_clusters)
+        added += unique_extend(gm["ingredients"], ing_from_text)
+        added += unique_extend(gm["ingredients"], ing_from_clusters)
 
         # Add_related: mild, safe SEO phrases that do not create medical claims
         # Keep it conservative.
@@ -277,19 +369,24 @@ def main() -> int:
             safe_phrases += ["anti inflammatory smoothie", "antioxidant smoothie"]
         if "heart_support" in gm["clusters"]:
             safe_phrases += ["heart healthy smoothie", "cholesterol support smoothie"]
-        unique_extend(gm["add_related"], safe_phrases)
+        added += unique_extend(gm["add_related"], safe_phrases)
 
-        after = json.dumps(gm, sort_keys=True)
-        if after != before:
+        if added:
             goal_map[slug] = gm
             touched += 1
             report.append((slug, gm))
             if args.limit and touched >= args.limit:
                 break
 
+    # Only a run over every goal may stamp the config as up to date
+    full_run = not (args.limit and touched >= args.limit)
+
     if touched == 0 and not clusters_changed:
         print("No changes proposed.")
-        return 0
+        if args.write and full_run and cfg.get("_source_mtimes") != mtimes:
+            cfg["_source_mtimes"] = mtimes
+            save_json(ENRICH_PATH, cfg)
+        return 0, False
 
     if touched > 0:
         print(f"Autopilot proposed changes for {touched} goal(s):")
@@ -300,18 +397,30 @@ def main() -> int:
 
     if not args.write:
         print("\nDRY RUN only. Re-run with --write to apply + enrich goals.json.")
-        return 0
+        return 0, False
 
+    # The config is saved before enrichment, as when enrichment ran as a
+    # separate script, so a failed enrichment still leaves it on disk
     save_json(ENRICH_PATH, cfg)
     print(f"\nWROTE: {ENRICH_PATH}")
 
-    # Run your existing script to push into data/goals.json
-    cmd = [sys.executable, "scripts/seo_enrich_goals.py", "--write"]
-    print("Running:", " ".join(cmd))
-    subprocess.check_call(cmd)
+    # Push into data/goals.json with the enrich script's run(), in this process:
+    # no second interpreter, and the config just computed is passed in memory
+    from scripts.seo_enrich_goals import load_json_many, run as enrich_goals
+
+    print("Running: seo_enrich_goals --write")
+    goals_doc, ing_doc = load_json_many(GOALS_PATH, INGREDIENTS_PATH)
+    goals_rewritten = enrich_goals(cfg, goals_doc, ing_doc, goals_path=GOALS_PATH) > 0
+
+    # Stamp the mtimes left after every write. Not when enrichment rewrote
+    # goals.json: main() then runs another pass over it, and that pass stamps
+    if full_run and not goals_rewritten:
+        cfg["_source_mtimes"] = source_mtimes()
+        save_json(ENRICH_PATH, cfg)
 
     print("DONE.")
-    return 0
+    # A --limit run that stopped early leaves the rest for the next invocation
+    return 0, goals_rewritten and full_run
 
 
 if __name__ == "__main__":
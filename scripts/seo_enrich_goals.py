@@ -1,15 +1,31 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Tuple
+
+try:
+    # Optional C parser, used for reads only: files are always written by the
+    # stdlib json, whose output (float repr, escaping) orjson doesn't match
+    import orjson
+except ImportError:
+    orjson = None
 
 
 def norm_kw(s: Any) -> str:
     if not s:
         return ""
-    s = str(s).strip().lower()
+    return _norm_kw_str(str(s))
+
+
+@functools.lru_cache(maxsize=8192)
+def _norm_kw_str(s: str) -> str:
+    # The same keywords recur across goals (cluster kws, ingredient phrases)
+    s = s.strip().lower()
     s = " ".join(s.split())
     return s
 
@@ -18,7 +34,7 @@ def slug_to_phrase(slug: str) -> str:
     return norm_kw(slug.replace("-", " "))
 
 
-def uniq_keep_order(items: List[str]) -> List[str]:
+def uniq_keep_order(items: Iterable[str]) -> List[str]:
     seen = set()
     out = []
     for x in items:
@@ -31,11 +47,26 @@ def uniq_keep_order(items: List[str]) -> List[str]:
 
 
 def load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    if orjson is not None:
+        return orjson.loads(path.read_bytes())
+    return json.loads(path.read_bytes())
+
+
+def load_json_many(*paths: Path) -> List[Any]:
+    """Load several independent JSON files concurrently (file reads release the GIL)."""
+    with ThreadPoolExecutor(max_workers=len(paths)) as ex:
+        return list(ex.map(load_json, paths))
+
+
+def save_json(path: Path, obj: Any) -> None:
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
 
 
 def remove_cross_dupes(primary: List[str], related: List[str]) -> Tuple[List[str], List[str]]:
     pset = set(primary)
+    if pset.isdisjoint(related):
+        # Usual case: nothing to drop, so skip building a copy of related
+        return primary, related
     related2 = [x for x in related if x not in pset]
     return primary, related2
 
@@ -63,22 +94,15 @@ def write_keywords(goal: Dict[str, Any], primary: List[str], related: List[str])
     goal["keywords"] = {"primary": primary, "related": related}
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--config", default="data/seo_goal_enrichment.json")
-    ap.add_argument("--goals", default="data/goals.json")
-    ap.add_argument("--ingredients", default="data/ingredients.json")
-    ap.add_argument("--write", action="store_true", help="Apply changes to goals.json")
-    args = ap.parse_args()
-
-    config_path = Path(args.config)
-    goals_path = Path(args.goals)
-    ing_path = Path(args.ingredients)
-
-    cfg = load_json(config_path)
-    goals_doc = load_json(goals_path)
-    ing_doc = load_json(ing_path)
+def run(cfg: Dict[str, Any], goals_doc: Any, ing_doc: Any, goals_path: Path | None = None) -> int:
+    """
+    Push the enrichment config's keywords into goals_doc (updated in place).
+    Prints the change report; when goals_path is given and any goal changed,
+    writes goals_doc there. Returns the number of goals touched.
 
+    Callers that already hold the documents (seo_autopilot) use this directly
+    instead of spawning the CLI.
+    """
     if not isinstance(goals_doc, dict) or "goals" not in goals_doc:
         raise SystemExit("goals.json must be an object with key 'goals' (list).")
     if not isinstance(ing_doc, dict):
@@ -92,7 +116,9 @@ def main() -> int:
     max_primary = int(defaults.get("max_primary", 12))
     max_related = int(defaults.get("max_related", 18))
 
-    ing_slugs = set(ing_doc.keys())
+    # slug -> keyword phrase, built once: one lookup both checks the slug and
+    # yields its phrase
+    ing_phrases = {s: slug_to_phrase(s) for s in ing_doc}
 
     changed = 0
     report_lines: List[str] = []
@@ -108,23 +134,22 @@ def main() -> int:
         cur_primary, cur_related = ensure_keywords(g)
 
         add_primary = uniq_keep_order(spec.get("add_primary") or [])
-        add_related = uniq_keep_order(spec.get("add_related") or [])
-
-        # cluster keywords -> related bucket by default
-        for cname in spec.get("clusters") or []:
-            kws = clusters.get(cname) or []
-            add_related.extend(kws)
-
-        add_related = uniq_keep_order(add_related)
+        # cluster keywords -> related bucket by default; one dedup pass over
+        # add_related followed by every cluster's keywords
+        add_related = uniq_keep_order(chain(
+            spec.get("add_related") or (),
+            chain.from_iterable(clusters.get(cname) or () for cname in spec.get("clusters") or ()),
+        ))
 
         # ingredient slugs -> phrase keywords
         added_ingredients: List[str] = []
         for ing_slug in spec.get("ingredients") or []:
             ing_slug = str(ing_slug).strip()
-            if ing_slug not in ing_slugs:
+            phrase = ing_phrases.get(ing_slug)
+            if phrase is None:
                 report_lines.append(f"[WARN] {slug}: ingredient slug not found in ingredients.json: {ing_slug}")
                 continue
-            added_ingredients.append(slug_to_phrase(ing_slug))
+            added_ingredients.append(phrase)
 
         # Merge
         new_primary = uniq_keep_order(cur_primary + add_primary)
@@ -142,8 +167,11 @@ def main() -> int:
         if new_primary != cur_primary or new_related != cur_related:
             changed += 1
             report_lines.append(f"[CHANGE] {slug}")
-            report_lines.append(f"  primary +{[x for x in new_primary if x not in cur_primary]}")
-            report_lines.append(f"  related +{[x for x in new_related if x not in cur_related]}")
+            # Set lookups keep the report diff linear; list order is kept so output is stable
+            cur_primary_set = set(cur_primary)
+            cur_related_set = set(cur_related)
+            report_lines.append(f"  primary +{[x for x in new_primary if x not in cur_primary_set]}")
+            report_lines.append(f"  related +{[x for x in new_related if x not in cur_related_set]}")
 
         write_keywords(g, new_primary, new_related)
 
@@ -153,10 +181,26 @@ def main() -> int:
         print("\n".join(report_lines))
         print(f"\nGoals touched: {changed}")
 
-    if args.write and changed > 0:
-        goals_path.write_text(json.dumps(goals_doc, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    if goals_path is not None and changed > 0:
+        save_json(goals_path, goals_doc)
         print(f"\nWROTE: {goals_path}")
 
+    return changed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--config", default="data/seo_goal_enrichment.json")
+    ap.add_argument("--goals", default="data/goals.json")
+    ap.add_argument("--ingredients", default="data/ingredients.json")
+    ap.add_argument("--write", action="store_true", help="Apply changes to goals.json")
+    args = ap.parse_args()
+
+    goals_path = Path(args.goals)
+
+    cfg, goals_doc, ing_doc = load_json_many(Path(args.config), goals_path, Path(args.ingredients))
+
+    run(cfg, goals_doc, ing_doc, goals_path=goals_path if args.write else None)
     return 0
 
 
@@ -7,8 +7,9 @@ This module provides:
 - AUTHZ_STRICT flag support for gradual rollout
 """
 import os
-from functools import wraps
-from flask import abort, jsonify, request, session
+import re
+from functools import lru_cache, wraps
+from flask import abort, g, jsonify, request, session
 from flask_login import current_user  # pyright: ignore[reportMissingImports]
 
 
@@ -23,21 +24,27 @@ def is_admin():
     Check if the current user is an admin.
     Currently checks for an 'is_admin' flag in the session or user object.
     Can be extended to check database roles if needed.
+    
+    The result is cached on flask.g, so repeated checks within one request
+    (e.g. several get_or_404_owned calls) only look at the session once.
     """
     if not AUTHZ_STRICT:
         # Permissive mode: allow access
         return False
     
+    cached = getattr(g, "_is_admin", None)
+    if cached is not None:
+        return cached
+    
     # Check session for admin flag
-    if session.get("is_admin"):
-        return True
+    result = bool(session.get("is_admin"))
     
     # Check current_user if Flask-Login is active
-    if hasattr(current_user, "is_authenticated") and current_user.is_authenticated:
-        if hasattr(current_user, "is_admin") and current_user.is_admin:
-            return True
+    if not result and hasattr(current_user, "is_authenticated") and current_user.is_authenticated:
+        result = bool(getattr(current_user, "is_admin", False))
     
-    return False
+    g._is_admin = result
+    return result
 
 
 def require_admin(f):
@@ -65,7 +72,61 @@ def require_admin(f):
     return decorated_function
 
 
-def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_admin=True):
+# Table/column names are interpolated into SQL, so only plain identifiers are allowed
+_IDENT_RX = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@lru_cache(maxsize=256)
+def _resource_query(model, id_field, owner_field=None, columns=None, probe_only=False):
+    """
+    The prepared SELECT for one (model, id_field, owner_field, columns,
+    probe_only) combination. columns is a tuple of column names (None means *);
+    probe_only selects a constant with LIMIT 1 instead of any columns.
+    Identifiers are validated against _IDENT_RX (ValueError otherwise); the
+    statement is built and placeholder-converted once, then served from cache.
+    """
+    import db
+    
+    for ident in (model, id_field, owner_field, *(columns or ())):
+        if ident is not None and not (isinstance(ident, str) and _IDENT_RX.match(ident)):
+            raise ValueError(f"Invalid SQL identifier: {ident!r}")
+    
+    if probe_only:
+        select_list = "1"
+    else:
+        select_list = ", ".join(columns) if columns else "*"
+    query = f"SELECT {select_list} FROM {model} WHERE {id_field} = ?"
+    if owner_field is not None:
+        query += f" AND {owner_field} = ?"
+    if probe_only:
+        query += " LIMIT 1"
+    return db.prepare_query(query)
+
+
+def _fetch_resource(model, id_field, id_value, owner_field=None, owner_id=None, columns=None, probe_only=False):
+    """
+    Fetch a single row of model as a dict, or None if there is no match
+    (True instead of the row when probe_only).
+    When owner_field is given, ownership is checked in the WHERE clause, so a
+    row the user doesn't own is never transferred.
+    The connection is released even if the query fails.
+    """
+    import db
+    
+    query = _resource_query(model, id_field, owner_field, columns, probe_only)
+    params = (id_value,) if owner_field is None else (id_value, owner_id)
+    
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return True if probe_only else db.row_to_dict(row, cursor)
+
+
+def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_admin=True,
+                     columns=None, probe_only=False):
     """
     Fetch a resource by ID and enforce ownership unless user is admin.
     
@@ -75,9 +136,13 @@ def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_adm
         id_value: The value to match
         owner_field: The field name that stores the owner ID (default: "user_id")
         allow_admin: If True, admins can access any resource (default: True)
+        columns: Column names to fetch instead of SELECT * (default: all columns)
+        probe_only: If True, only check that the resource exists and is owned,
+            without fetching the row (for guards before a scoped update/delete)
     
     Returns:
-        The resource row (dict) if found and owned by user (or admin)
+        The resource row (dict) if found and owned by user (or admin);
+        True instead of the row when probe_only (None if not found in permissive mode)
     
     Raises:
         404: If resource not found or not owned by user (when AUTHZ_STRICT=1)
@@ -87,8 +152,13 @@ def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_adm
         # In a route handler:
         recipe = get_or_404_owned("recipes", "id", recipe_id, "user_id")
         return jsonify(recipe)
+        
+        # Ownership guard only:
+        get_or_404_owned("recipes", "id", recipe_id, probe_only=True)
     """
-    import db
+    if columns is not None:
+        # Hashable, for the statement cache
+        columns = tuple(columns)
     
     # Get current user ID
     user_id = session.get("user_id")
@@ -96,17 +166,9 @@ def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_adm
     # In permissive mode, skip ownership checks
     if not AUTHZ_STRICT:
         # Just fetch the resource without ownership check
-        conn = db.get_conn()
         try:
-            cursor = conn.cursor()
-            query = db.prepare_query(f"SELECT * FROM {model} WHERE {id_field} = ?")
-            cursor.execute(query, (id_value,))
-            row = cursor.fetchone()
-            conn.close()
-            if row:
-                return db.row_to_dict(row, cursor)
             # Return None in permissive mode if not found
-            return None
+            return _fetch_resource(model, id_field, id_value, columns=columns, probe_only=probe_only)
         except Exception:
             return None
     
@@ -119,36 +181,29 @@ def get_or_404_owned(model, id_field, id_value, owner_field="user_id", allow_adm
     # Check if user is admin (if allowed)
     is_user_admin = allow_admin and is_admin()
     
-    # Fetch the resource
-    conn = db.get_conn()
+    # Fetch the resource; unless admin, only a row owned by the user matches
     try:
-        cursor = conn.cursor()
-        query = db.prepare_query(f"SELECT * FROM {model} WHERE {id_field} = ?")
-        cursor.execute(query, (id_value,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            # Resource not found
-            if request.path.startswith("/api/"):
-                return jsonify({"error": "not_found"}), 404
-            abort(404)
-        
-        resource = db.row_to_dict(row, cursor)
-        
-        # Check ownership (unless admin)
-        if not is_user_admin:
-            resource_owner_id = resource.get(owner_field)
-            if resource_owner_id != user_id:
-                # User doesn't own this resource
-                if request.path.startswith("/api/"):
-                    return jsonify({"error": "forbidden"}), 404  # 404 to hide existence
-                abort(404)
-        
-        return resource
-    except Exception as e:
+        if is_user_admin:
+            resource = _fetch_resource(model, id_field, id_value, columns=columns, probe_only=probe_only)
+        elif owner_field is None:
+            # No owner column to scope by: a non-admin owns nothing, so don't
+            # run an unscoped fetch
+            resource = None
+        else:
+            resource = _fetch_resource(
+                model, id_field, id_value, owner_field, user_id, columns=columns, probe_only=probe_only
+            )
+    except Exception:
         # Database error
         if request.path.startswith("/api/"):
             return jsonify({"error": "database_error"}), 500
         abort(500)
+    
+    if resource is None:
+        # Not found, or not owned by the user: both are 404 to hide existence
+        if request.path.startswith("/api/"):
+            return jsonify({"error": "not_found"}), 404
+        abort(404)
+    
+    return resource
 
@@ -16,12 +16,30 @@ import os
 import sys
 import json
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 from typing import Dict, Any, Optional
 
 # Default configuration
 DEFAULT_BASE_URL = os.environ.get("BASE_URL", "https://startup-hmwd.onrender.com")
 DEFAULT_TIMEOUT = 40  # seconds
+# The endpoint tests are independent, so they all run at once
+MAX_WORKERS = 6
+
+# One keep-alive session for every request, so the TCP/TLS handshake is paid once
+# per run. Idempotent requests are retried on gateway errors (e.g. a cold start);
+# after the last retry the final response is returned and reported as usual.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504], raise_on_status=False),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
 
 
 class Colors:
@@ -34,24 +52,36 @@ class Colors:
     BOLD = '\033[1m'
 
 
+# No escape codes when output is redirected (CI logs, files)
+if not sys.stdout.isatty():
+    for _name in ("GREEN", "RED", "YELLOW", "BLUE", "RESET", "BOLD"):
+        setattr(Colors, _name, "")
+
+# Message templates, built once
+_FMT_OK = f"{Colors.GREEN}✓ %s{Colors.RESET}"
+_FMT_ERROR = f"{Colors.RED}✗ %s{Colors.RESET}"
+_FMT_WARNING = f"{Colors.YELLOW}⚠ %s{Colors.RESET}"
+_FMT_INFO = f"{Colors.BLUE}ℹ %s{Colors.RESET}"
+
+
 def print_success(message: str):
     """Print success message in green"""
-    print(f"{Colors.GREEN}✓ {message}{Colors.RESET}")
+    print(_FMT_OK % message)
 
 
 def print_error(message: str):
     """Print error message in red"""
-    print(f"{Colors.RED}✗ {message}{Colors.RESET}")
+    print(_FMT_ERROR % message)
 
 
 def print_warning(message: str):
     """Print warning message in yellow"""
-    print(f"{Colors.YELLOW}⚠ {message}{Colors.RESET}")
+    print(_FMT_WARNING % message)
 
 
 def print_info(message: str):
     """Print info message in blue"""
-    print(f"{Colors.BLUE}ℹ {message}{Colors.RESET}")
+    print(_FMT_INFO % message)
 
 
 def test_endpoint(
@@ -73,9 +103,9 @@ def test_endpoint(
             print_info(f"Testing {method} {url}")
         
         if method.upper() == "GET":
-            response = requests.get(url, timeout=DEFAULT_TIMEOUT, headers=headers)
+            response = SESSION.get(url, timeout=DEFAULT_TIMEOUT, headers=headers)
         elif method.upper() == "POST":
-            response = requests.post(
+            response = SESSION.post(
                 url,
                 json=data,
                 timeout=DEFAULT_TIMEOUT,
@@ -247,6 +277,45 @@ def test_nlp_query_endpoint(base_url: str, verbose: bool = False) -> bool:
         return False
 
 
+class _ThreadOutput:
+    """
+    sys.stdout stand-in while tests run in parallel: each worker thread's
+    output goes to its own buffer, so sections can be printed whole, in order.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            return self.stream.write(text)
+        buffer.append(text)
+        return len(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def run(self, test, *args) -> tuple[bool, str]:
+        """Call test(*args) with this thread's output captured; returns (result, output)."""
+        self.local.buffer = []
+        try:
+            return test(*args), "".join(self.local.buffer)
+        finally:
+            self.local.buffer = None
+
+
+TESTS = (
+    ("home", test_home_page),
+    ("categories", test_categories_endpoint),
+    ("category_hierarchy", test_category_hierarchy_endpoint),
+    ("ingredients", test_ingredients_endpoint),
+    ("analyze", test_analyze_endpoint),
+    ("nlp_query", test_nlp_query_endpoint),
+)
+
+
 def run_all_tests(base_url: str, verbose: bool = False) -> Dict[str, bool]:
     """Run all smoke tests"""
     results = {}
@@ -258,13 +327,22 @@ def run_all_tests(base_url: str, verbose: bool = False) -> Dict[str, bool]:
     print(f"Base URL: {base_url}")
     print(f"{Colors.RESET}")
     
-    # Run tests
-    results["home"] = test_home_page(base_url, verbose)
-    results["categories"] = test_categories_endpoint(base_url, verbose)
-    results["category_hierarchy"] = test_category_hierarchy_endpoint(base_url, verbose)
-    results["ingredients"] = test_ingredients_endpoint(base_url, verbose)
-    results["analyze"] = test_analyze_endpoint(base_url, verbose)
-    results["nlp_query"] = test_nlp_query_endpoint(base_url, verbose)
+    # Run tests concurrently (wall time is the slowest endpoint, not the sum);
+    # each test's output is buffered and printed in the usual order
+    # (ingredients fetches its own category list, so no test depends on another)
+    output = _ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = [
+                (name, pool.submit(output.run, test, base_url, verbose))
+                for name, test in TESTS
+            ]
+            for name, future in futures:
+                results[name], text = future.result()
+                output.stream.write(text)
+    finally:
+        sys.stdout = output.stream
     
     # Print summary
     print("\n" + "="*60)
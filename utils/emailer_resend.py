@@ -1,14 +1,89 @@
 # utils/emailer_resend.py
+import base64
+import http.client
 import json
 import os
-import urllib.error
+import threading
+import urllib.parse
 import urllib.request
+from itertools import islice
 
+RESEND_HOST = "api.resend.com"
+# Resend accepts at most this many emails per /emails/batch request
+RESEND_BATCH_MAX = 100
 
-def send_email_resend(to, subject, html, text, *, reply_to=None, timeout=15):
+# One keep-alive HTTPS connection per process, reused across sends so only the
+# first email pays the TCP + TLS handshake. http.client connections aren't
+# thread-safe, so requests on it are serialized.
+_conn = None
+_conn_lock = threading.Lock()
+
+# Errors while writing the request that mean a reused keep-alive connection
+# was already closed by the server. The request never reached it, so it is
+# retried once on a new connection, as is RemoteDisconnected (closed before
+# any status line). Other errors after the request was written are not
+# retried: Resend may already have accepted the email.
+_STALE_SEND_ERRORS = (BrokenPipeError, ConnectionResetError)
+
+
+def _new_connection(timeout):
     """
-    Dependency-free Resend email sender.
+    HTTPS connection to RESEND_HOST, tunnelled through the proxy from
+    HTTPS_PROXY / https_proxy (honoring NO_PROXY) when one is configured,
+    as urllib does.
     """
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(RESEND_HOST):
+        return http.client.HTTPSConnection(RESEND_HOST, timeout=timeout)
+
+    if "://" not in proxy:
+        proxy = "http://" + proxy
+    parts = urllib.parse.urlsplit(proxy)
+    headers = {}
+    if parts.username:
+        creds = f"{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(creds.encode()).decode("ascii")
+    conn = http.client.HTTPSConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    conn.set_tunnel(RESEND_HOST, 443, headers=headers)
+    return conn
+
+
+def _post_json(path, body, headers, timeout):
+    """
+    POST body (bytes) to https://RESEND_HOST{path} on the shared connection.
+    Returns (status, raw response bytes).
+    """
+    global _conn
+    with _conn_lock:
+        while True:
+            reused = _conn is not None
+            if not reused:
+                _conn = _new_connection(timeout)
+            elif _conn.sock is not None:
+                _conn.sock.settimeout(timeout)
+            sent = False
+            try:
+                _conn.request("POST", path, body=body, headers=headers)
+                sent = True
+                resp = _conn.getresponse()
+                raw = resp.read()
+            except Exception as e:
+                _conn.close()
+                _conn = None
+                unsent = isinstance(e, http.client.RemoteDisconnected) or (
+                    not sent and isinstance(e, _STALE_SEND_ERRORS)
+                )
+                if reused and unsent:
+                    continue
+                raise
+            if resp.will_close:
+                _conn.close()
+                _conn = None
+            return resp.status, raw
+
+
+def _config():
+    """(api_key, sender) from RESEND_API_KEY / RESEND_FROM; raises RuntimeError if unset."""
     api_key = (os.environ.get("RESEND_API_KEY") or "").strip()
     if not api_key:
         raise RuntimeError("RESEND_API_KEY is not set")
@@ -16,7 +91,10 @@ def send_email_resend(to, subject, html, text, *, reply_to=None, timeout=15):
     sender = (os.environ.get("RESEND_FROM") or "").strip()
     if not sender:
         raise RuntimeError("RESEND_FROM is not set")
+    return api_key, sender
 
+
+def _build_message(sender, to, subject, html, text, reply_to=None):
     # Normalize recipients
     if isinstance(to, str):
         to_list = [to]
@@ -32,24 +110,63 @@ def send_email_resend(to, subject, html, text, *, reply_to=None, timeout=15):
     }
     if reply_to:
         payload["reply_to"] = reply_to
+    return payload
 
-    req = urllib.request.Request(
-        "https://api.resend.com/emails",
-        data=json.dumps(payload).encode("utf-8"),
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json",
-        },
-        method="POST",
-    )
 
+def _resend_post(path, payload, api_key, timeout):
+    """POST payload as JSON to the Resend API; returns the decoded response."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Connection": "keep-alive",
+    }
+
+    # Compact and UTF-8 rather than \uXXXX escapes: HTML bodies are the bulk of the bytes
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
     try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            raw = resp.read().decode("utf-8")
-            return json.loads(raw) if raw else {}
-    except urllib.error.HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"Resend HTTPError {e.code}: {body}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Resend URLError: {e}") from e
+        status, raw = _post_json(path, body, headers, timeout)
+    except (http.client.HTTPException, OSError) as e:
+        raise RuntimeError(f"Resend connection error: {e}") from e
+
+    body = raw.decode("utf-8", errors="replace")
+    if status >= 400:
+        raise RuntimeError(f"Resend HTTPError {status}: {body}")
+    return json.loads(body) if body else {}
+
+
+def send_email_resend(to, subject, html, text, *, reply_to=None, timeout=15):
+    """
+    Dependency-free Resend email sender.
+    """
+    api_key, sender = _config()
+    payload = _build_message(sender, to, subject, html, text, reply_to)
+    return _resend_post("/emails", payload, api_key, timeout)
+
+
+def send_emails_resend_batch(messages, *, timeout=15):
+    """
+    Send many separate emails with Resend's /emails/batch endpoint, up to
+    RESEND_BATCH_MAX per request instead of one request per email.
+
+    messages: iterable of dicts with the send_email_resend fields
+    (to, subject, html, text, optional reply_to).
+    Returns the per-email results ({"id": ...}) in message order.
+    Raises RuntimeError on the first failing request; earlier batches are sent.
+    """
+    api_key, sender = _config()
+    payloads = (
+        _build_message(
+            sender, m["to"], m["subject"], m.get("html"), m.get("text"), m.get("reply_to")
+        )
+        for m in messages
+    )
+
+    results = []
+    while True:
+        chunk = list(islice(payloads, RESEND_BATCH_MAX))
+        if not chunk:
+            break
+        response = _resend_post("/emails/batch", chunk, api_key, timeout)
+        results.extend(response.get("data") or [])
+    return results
@@ -1,34 +1,64 @@
 from __future__ import annotations
 
+import heapq
 import re
-from typing import Any, Dict, List, Tuple
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
 
+__all__ = [
+    "compute_related_goals",
+    "compute_related_goals_for_ingredient",
+    "compute_related_ingredients",
+]
 
 _WORD_RE = re.compile(r"[a-z0-9]+", re.IGNORECASE)
+_SPACE_UNDER_RE = re.compile(r"[\s_]+")
+_NON_SLUG_RE = re.compile(r"[^a-z0-9\-]+")
+_DASH_RUN_RE = re.compile(r"-{2,}")
+# Strings _slugify_kw returns unchanged: dash-separated runs of a-z/0-9
+_CANONICAL_SLUG_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+# Every ASCII character other than a-z/0-9 -> space (inputs are lowercased first)
+_NON_ALNUM_TABLE = str.maketrans({c: " " for c in range(128) if not chr(c).isalnum()})
 
 
 def _norm_kw(s: Any) -> str:
     if not s:
         return ""
-    s = str(s).strip().lower()
-    s = re.sub(r"[\s_]+", " ", s)
-    return s
+    return _norm_kw_str(str(s))
+
+
+# Keywords repeat heavily across goals, so normalized forms are cached and
+# interned: every goal's keyword sets then hold the same string objects, and
+# set lookups between them match on identity before comparing characters.
+@lru_cache(maxsize=4096)
+def _norm_kw_str(s: str) -> str:
+    return sys.intern(_SPACE_UNDER_RE.sub(" ", s.strip().lower()))
 
 
+@lru_cache(maxsize=4096)
 def _slugify_kw(s: str) -> str:
     s = _norm_kw(s)
     if not s:
         return ""
     s = s.replace(" ", "-")
-    s = re.sub(r"[^a-z0-9\-]+", "", s)
-    s = re.sub(r"-{2,}", "-", s).strip("-")
+    s = _NON_SLUG_RE.sub("", s)
+    s = _DASH_RUN_RE.sub("-", s).strip("-")
     return s
 
 
+def _is_canonical_slug(s: str) -> bool:
+    return _CANONICAL_SLUG_RE.fullmatch(s) is not None
+
+
 def _tokens(s: Any) -> List[str]:
     if not s:
         return []
-    return _WORD_RE.findall(str(s).lower())
+    s = str(s).lower()
+    if s.isascii():
+        # Same tokens as _WORD_RE, via a C-level table lookup instead of a regex scan
+        return s.translate(_NON_ALNUM_TABLE).split()
+    return _WORD_RE.findall(s)
 
 
 def _goal_keywords(goal: Dict[str, Any]) -> Tuple[List[str], List[str]]:
@@ -46,6 +76,114 @@ def _goal_keywords(goal: Dict[str, Any]) -> Tuple[List[str], List[str]]:
     return primary_n, related_n
 
 
+# id(registry) -> (registry, derived index). The registry itself is kept so
+# its id can't be reused by another object while the entry is cached.
+_INDEX_CACHE: Dict[int, Tuple[Any, Any]] = {}
+_INDEX_CACHE_MAX = 8
+
+
+def _memo_by_identity(registry: Any, build: Callable[[Any], Any]) -> Any:
+    """
+    build(registry), memoized on the registry object's identity.
+    seo_registry serves the same parsed object until the file's mtime changes,
+    so derived indexes are built once per registry load, not per request.
+    """
+    hit = _INDEX_CACHE.get(id(registry))
+    if hit is not None and hit[0] is registry:
+        return hit[1]
+    index = build(registry)
+    if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX:
+        _INDEX_CACHE.clear()
+    _INDEX_CACHE[id(registry)] = (registry, index)
+    return index
+
+
+# Width of the per-goal keyword mask. Goals carry ~15 keywords each, which
+# saturates a 64-bit mask; at 1024 bits disjoint goals are reliably told apart
+# and the AND is still a single C-level int op.
+_KW_MASK_BITS = 1024
+
+
+def _keyword_mask(keywords: List[str]) -> int:
+    """
+    Bloom-style signature of a keyword list: one bit per keyword hash.
+    Goals whose masks don't intersect share no keyword (no false negatives).
+    """
+    mask = 0
+    for kw in keywords:
+        mask |= 1 << (hash(kw) & (_KW_MASK_BITS - 1))
+    return mask
+
+
+class GoalRow(NamedTuple):
+    """One goal, preprocessed for scoring and output."""
+    slug: str
+    name: str
+    name_lower: str
+    summary: str
+    primary: List[str]
+    related: List[str]
+    primary_set: frozenset
+    related_set: frozenset
+    kw_mask: int
+
+
+def _build_goals_index(goals_registry: Dict[str, Any]) -> Tuple[List[GoalRow], Dict[str, GoalRow]]:
+    """
+    Preprocess every goal once into a GoalRow: normalized keyword lists and
+    frozensets, a keyword mask, plus display name and summary.
+    Returns (rows in registry order, slug -> first row).
+    """
+    goals = goals_registry.get("goals") or []
+    if not isinstance(goals, list):
+        goals = []
+
+    entries: List[GoalRow] = []
+    by_slug: Dict[str, GoalRow] = {}
+    for g in goals:
+        if not isinstance(g, dict):
+            continue
+        slug = g.get("slug")
+        if not slug:
+            continue
+        primary, related = _goal_keywords(g)
+        name = (g.get("name") or slug.replace("-", " ").title()).strip()
+        entry = GoalRow(
+            slug=slug,
+            name=name,
+            name_lower=name.lower(),
+            summary=(g.get("summary") or "").strip(),
+            primary=primary,
+            related=related,
+            primary_set=frozenset(primary),
+            related_set=frozenset(related),
+            kw_mask=_keyword_mask(primary + related),
+        )
+        entries.append(entry)
+        by_slug.setdefault(slug, entry)
+    return entries, by_slug
+
+
+def _goals_index(goals_registry: Dict[str, Any]) -> Tuple[List[GoalRow], Dict[str, GoalRow]]:
+    return _memo_by_identity(goals_registry, _build_goals_index)
+
+
+def _overlap_count(a: frozenset, b: frozenset) -> int:
+    """
+    len(a & b). Most goal pairs share nothing: isdisjoint() walks the smaller
+    set and allocates nothing, so the intersection is only built on a hit
+    (set & set also iterates the smaller side, in C).
+    """
+    if a.isdisjoint(b):
+        return 0
+    return len(a & b)
+
+
+def _rank_key(t: Tuple[int, str, str, Any]) -> Tuple[int, str, str]:
+    # Score desc, then name, then slug
+    return (-t[0], t[1], t[2])
+
+
 def compute_related_goals(
     current_slug: str,
     goals_registry: Dict[str, Any],
@@ -58,51 +196,44 @@ def compute_related_goals(
     Returns only results with score > 0 (no fake links).
     Tie-break: name, then slug.
     """
-    goals = goals_registry.get("goals") or []
-    if not isinstance(goals, list):
-        return []
+    # Keyword sets are precomputed once per registry load
+    entries, by_slug = _goals_index(goals_registry)
 
-    current = None
-    for g in goals:
-        if isinstance(g, dict) and g.get("slug") == current_slug:
-            current = g
-            break
+    current = by_slug.get(current_slug)
     if not current:
         return []
 
-    cur_primary, cur_related = _goal_keywords(current)
-    cur_primary_set = set(cur_primary)
-    cur_related_set = set(cur_related)
+    cur_primary_set = current.primary_set
+    cur_related_set = current.related_set
+    cur_mask = current.kw_mask
 
-    scored: List[Tuple[int, str, str, Dict[str, Any]]] = []
-    for g in goals:
-        if not isinstance(g, dict):
+    scored: List[Tuple[int, str, str, GoalRow]] = []
+    for e in entries:
+        slug = e.slug
+        if slug == current_slug:
             continue
-        slug = g.get("slug")
-        if not slug or slug == current_slug:
+        # One AND rejects most goals with no shared vocabulary before any set work
+        if not (cur_mask & e.kw_mask):
             continue
 
-        other_primary, other_related = _goal_keywords(g)
-        p_overlap = cur_primary_set.intersection(other_primary)
-        r_overlap = cur_related_set.intersection(other_related)
-
-        score = (3 * len(p_overlap)) + (1 * len(r_overlap))
+        score = (3 * _overlap_count(cur_primary_set, e.primary_set)) + (
+            1 * _overlap_count(cur_related_set, e.related_set)
+        )
         if score <= 0:
             continue
 
-        name = (g.get("name") or slug.replace("-", " ").title()).strip()
-        scored.append((score, name.lower(), slug, g))
+        scored.append((score, e.name_lower, slug, e))
 
-    scored.sort(key=lambda t: (-t[0], t[1], t[2]))
+    # Only the top `limit` are needed: O(N log limit) instead of a full sort
+    top = heapq.nsmallest(max(0, int(limit)), scored, key=_rank_key)
 
     out: List[Dict[str, Any]] = []
-    for score, _name_l, slug, g in scored[: max(0, int(limit))]:
-        name = (g.get("name") or slug.replace("-", " ").title()).strip()
+    for score, _name_l, slug, e in top:
         out.append(
             {
                 "slug": slug,
-                "name": name,
-                "summary": (g.get("summary") or "").strip(),
+                "name": e.name,
+                "summary": e.summary,
                 "score": score,
             }
         )
@@ -147,9 +278,7 @@ def compute_related_goals_for_ingredient(
     """
     if not ingredient_slug or not isinstance(goals_registry, dict):
         return []
-    goals = goals_registry.get("goals") or []
-    if not isinstance(goals, list):
-        return []
+    entries, _by_slug = _goals_index(goals_registry)
     ing_reg = ingredients_registry if isinstance(ingredients_registry, dict) else {}
     candidates = _ingredient_candidates(ingredient_slug, ing_reg)
     if not candidates:
@@ -161,62 +290,47 @@ def compute_related_goals_for_ingredient(
                 return True
         return False
 
-    scored: List[Tuple[int, str, str, Dict[str, Any]]] = []
-    for g in goals:
-        if not isinstance(g, dict):
-            continue
-        s = g.get("slug")
-        if not s:
-            continue
-        p, r = _goal_keywords(g)
+    scored: List[Tuple[int, str, str, GoalRow]] = []
+    for e in entries:
         score = 0
-        for k in p:
+        for k in e.primary:
             if matches(k):
                 score += 3
-        for k in r:
+        for k in e.related:
             if matches(k):
                 score += 1
         if score <= 0:
             continue
-        name = (g.get("name") or s.replace("-", " ").title()).strip()
-        scored.append((score, name.lower(), s, g))
+        scored.append((score, e.name_lower, e.slug, e))
 
-    scored.sort(key=lambda t: (-t[0], t[1], t[2]))
     cap = max(6, min(10, max(0, int(limit))))
     out: List[Dict[str, Any]] = []
-    for score, _nl, s, g in scored[:cap]:
-        name = (g.get("name") or s.replace("-", " ").title()).strip()
+    for score, _nl, s, e in heapq.nsmallest(cap, scored, key=_rank_key):
         out.append(
             {
                 "slug": s,
-                "name": name,
-                "summary": (g.get("summary") or "").strip(),
+                "name": e.name,
+                "summary": e.summary,
                 "score": score,
             }
         )
     return out
 
 
-def compute_related_ingredients(
-    goal: Dict[str, Any],
+def _build_ingredients_index(
     ingredients_registry: Dict[str, Any],
-    limit: int = 12,
-) -> List[Dict[str, Any]]:
+) -> Tuple[Dict[str, str], Dict[str, frozenset], Dict[str, int], Dict[str, int]]:
     """
-    Suggested ingredients derived from goal keywords:
-    - Direct slug match: keyword -> slugified -> ingredients_registry key
-    - Token subset match against ingredient slug + common name fields
-    Scoring:
-      +3 for primary keyword match
-      +1 for related keyword match
+    Preprocess the ingredient registry once. Returns
+    (slug -> display name,
+     inverted index token -> slugs whose slug/name fields contain that token,
+     token -> its bit (1 << token id),
+     slug -> token mask, the OR of its tokens' bits).
     """
-    if not isinstance(ingredients_registry, dict) or not ingredients_registry:
-        return []
-
-    primary, related = _goal_keywords(goal)
-
-    ing_tokens: Dict[str, set] = {}
     ing_display: Dict[str, str] = {}
+    postings: Dict[str, set] = {}
+    token_bits: Dict[str, int] = {}
+    ing_masks: Dict[str, int] = {}
     for slug, obj in ingredients_registry.items():
         if not slug:
             continue
@@ -237,7 +351,38 @@ def compute_related_ingredients(
                 str(obj.get("ingredient") or ""),
             ]
         )
-        ing_tokens[slug] = set(_tokens(blob))
+        mask = 0
+        for tok in set(_tokens(blob)):
+            postings.setdefault(tok, set()).add(slug)
+            bit = token_bits.get(tok)
+            if bit is None:
+                bit = token_bits[sys.intern(tok)] = 1 << len(token_bits)
+            mask |= bit
+        ing_masks[slug] = mask
+    token_index = {sys.intern(tok): frozenset(slugs) for tok, slugs in postings.items()}
+    return ing_display, token_index, token_bits, ing_masks
+
+
+def compute_related_ingredients(
+    goal: Dict[str, Any],
+    ingredients_registry: Dict[str, Any],
+    limit: int = 12,
+) -> List[Dict[str, Any]]:
+    """
+    Suggested ingredients derived from goal keywords:
+    - Direct slug match: keyword -> slugified -> ingredients_registry key
+    - Token subset match against ingredient slug + common name fields
+    Scoring:
+      +3 for primary keyword match
+      +1 for related keyword match
+    """
+    if not isinstance(ingredients_registry, dict) or not ingredients_registry:
+        return []
+
+    primary, related = _goal_keywords(goal)
+
+    # Display names and the token index are built once per registry load
+    ing_display, token_index, token_bits, ing_masks = _memo_by_identity(ingredients_registry, _build_ingredients_index)
 
     scores: Dict[str, int] = {}
 
@@ -246,32 +391,52 @@ def compute_related_ingredients(
             scores[slug] = scores.get(slug, 0) + pts
 
     def match_keyword(kw: str, pts: int):
+        # Keywords that are already slugs hit the registry without slugifying
+        if kw in ingredients_registry and _is_canonical_slug(kw):
+            add_score(kw, pts)
+            return
+
         slug_cand = _slugify_kw(kw)
         if slug_cand and slug_cand in ingredients_registry:
             add_score(slug_cand, pts)
             return
 
-        toks = [t for t in _tokens(kw) if len(t) >= 3]
+        toks = {t for t in _tokens(kw) if len(t) >= 3}
         if not toks:
             return
-        toks_set = set(toks)
 
-        for slug, tset in ing_tokens.items():
-            if toks_set.issubset(tset):
-                add_score(slug, pts)
+        # A token no ingredient has rules out every ingredient
+        if not all(t in token_bits for t in toks):
+            return
+
+        # Ingredients containing every token: walk the shortest postings list
+        # and keep the slugs whose token mask covers the keyword's mask (one
+        # int AND + compare per candidate). A single-token keyword reads its
+        # postings list as-is.
+        shortest = min((token_index[t] for t in toks), key=len)
+        if len(toks) == 1:
+            candidates = shortest
+        else:
+            kw_mask = 0
+            for t in toks:
+                kw_mask |= token_bits[t]
+            candidates = [s for s in shortest if ing_masks[s] & kw_mask == kw_mask]
+        for slug in candidates:
+            add_score(slug, pts)
 
     for kw in primary:
         match_keyword(kw, 3)
     for kw in related:
         match_keyword(kw, 1)
 
-    ranked = sorted(
+    ranked = heapq.nsmallest(
+        max(0, int(limit)),
         scores.items(),
         key=lambda kv: (-kv[1], ing_display.get(kv[0], kv[0]).lower(), kv[0]),
     )
 
     out: List[Dict[str, Any]] = []
-    for slug, score in ranked[: max(0, int(limit))]:
+    for slug, score in ranked:
         out.append(
             {
                 "slug": slug,
@@ -4,7 +4,7 @@ import json
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from flask import current_app, has_app_context
 
@@ -39,7 +39,34 @@ def _load_json_cached(abs_path: str, mtime: float) -> Any:
         return json.load(f)
 
 
-def load_json_registry(filename: str) -> Any:
+@lru_cache(maxsize=8)
+def _load_goals_cached(abs_path: str, mtime: float) -> Tuple[Any, Dict[str, Dict[str, Any]]]:
+    """
+    goals.json, with every goal's keywords normalized to
+    {"primary": [...], "related": [...]} once per load, so request handlers
+    never write to the shared cached registry.
+    Returns (data, slug -> goal), the index keeping the first goal per slug.
+    """
+    data = _load_json_cached(abs_path, mtime)
+    by_slug: Dict[str, Dict[str, Any]] = {}
+    goals = data.get("goals") if isinstance(data, dict) else None
+    if isinstance(goals, list):
+        for g in goals:
+            if not isinstance(g, dict):
+                continue
+            g.setdefault("keywords", {})
+            if not isinstance(g["keywords"], dict):
+                g["keywords"] = {}
+            g["keywords"].setdefault("primary", [])
+            g["keywords"].setdefault("related", [])
+            slug = g.get("slug")
+            if isinstance(slug, str):
+                by_slug.setdefault(slug, g)
+    return data, by_slug
+
+
+def _load_registry(filename: str, loader) -> Any:
+    """Load data/<filename> through loader(abs_path, mtime), logging failures."""
     path = _data_path(filename)
 
     try:
@@ -54,7 +81,7 @@ def load_json_registry(filename: str) -> Any:
         raise
 
     try:
-        return _load_json_cached(str(path), stat.st_mtime)
+        return loader(str(path), stat.st_mtime)
     except Exception:
         _log_exception(
             "SEO registry failed to load/parse: path=%s | size=%s bytes",
@@ -64,24 +91,24 @@ def load_json_registry(filename: str) -> Any:
         raise
 
 
-def get_goals_registry() -> Dict[str, Any]:
-    data = load_json_registry("goals.json")
+def load_json_registry(filename: str) -> Any:
+    return _load_registry(filename, _load_json_cached)
+
+
+def _load_goals() -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    data, by_slug = _load_registry("goals.json", _load_goals_cached)
     if not isinstance(data, dict) or "goals" not in data or not isinstance(data["goals"], list):
         raise ValueError("goals.json must be an object with a list field 'goals'")
-    return data
+    return data, by_slug
+
+
+def get_goals_registry() -> Dict[str, Any]:
+    return _load_goals()[0]
 
 
 def get_goal_by_slug(slug: str) -> Optional[Dict[str, Any]]:
-    reg = get_goals_registry()
-    for g in reg["goals"]:
-        if isinstance(g, dict) and g.get("slug") == slug:
-            g.setdefault("keywords", {})
-            if not isinstance(g["keywords"], dict):
-                g["keywords"] = {}
-            g["keywords"].setdefault("primary", [])
-            g["keywords"].setdefault("related", [])
-            return g
-    return None
+    # O(1) lookup in the slug index built at load; keywords are already normalized
+    return _load_goals()[1].get(slug)
 
 
 def get_ingredients_registry() -> Dict[str, Any]:
@@ -4,10 +4,37 @@ Temporary script to verify password hashing in the database.
 Queries the users table to check if passwords are stored as hashes.
 """
 import sys
-from db import get_conn
+
+# The test user's row if it exists, otherwise the first user by email, in one
+# round trip; pick = 0 marks the test user
+HASH_ROW_QUERY = """
+    SELECT email, password_hash, pick FROM (
+        SELECT email, password_hash, 0 AS pick FROM users WHERE email = ?
+        UNION ALL
+        SELECT * FROM (
+            SELECT email, password_hash, 1 AS pick FROM users ORDER BY email LIMIT 1
+        ) AS first_user
+    ) AS candidates
+    ORDER BY pick
+    LIMIT 1
+"""
+
+def _print_hash_row(email, password_hash):
+    """
+    Print a user's email, password hash, hash length and format.
+    Returns True if the hash is a werkzeug pbkdf2:sha256 hash.
+    """
+    print(f"Email: {email}")
+    print(f"\nPassword Hash: {password_hash}")
+    print(f"\nHash Length: {len(password_hash) if password_hash else 0} characters")
+    print(f"\nHash Format: {'pbkdf2:sha256' if password_hash and password_hash.startswith('pbkdf2:sha256') else 'Unknown'}")
+    return bool(password_hash) and password_hash.startswith('pbkdf2:sha256:')
 
 def verify_password_hash():
     """Query the database for a test user and display their password hash"""
+    # Imported here so loading this module for its helpers doesn't pull in db
+    from db import get_conn, prepare_query
+
     try:
         # Connect to database
         conn = get_conn()
@@ -16,36 +43,29 @@ def verify_password_hash():
         # Query for the test user
         email = 'security_test@example.com'
         
-        # Use appropriate query syntax based on database type
-        from db import USE_POSTGRES
-        if USE_POSTGRES:
-            query = "SELECT email, password_hash FROM users WHERE email = %s"
-        else:
-            query = "SELECT email, password_hash FROM users WHERE email = ?"
-        
-        cursor.execute(query, (email,))
+        # prepare_query converts the placeholders for PostgreSQL
+        cursor.execute(prepare_query(HASH_ROW_QUERY), (email,))
         result = cursor.fetchone()
         
-        if result:
-            # Handle both dict (PostgreSQL) and Row (SQLite) results
-            if isinstance(result, dict):
-                user_email = result.get('email')
-                password_hash = result.get('password_hash')
-            else:
-                user_email = result[0]
-                password_hash = result[1]
-            
+        # Handle both dict (PostgreSQL) and Row (SQLite) results
+        if result is None:
+            user_email = password_hash = pick = None
+        elif isinstance(result, dict):
+            user_email = result.get('email')
+            password_hash = result.get('password_hash')
+            pick = result.get('pick')
+        else:
+            user_email, password_hash, pick = result[0], result[1], result[2]
+        
+        if pick == 0:
             print("=" * 70)
             print("PASSWORD HASH VERIFICATION")
             print("=" * 70)
-            print(f"Email: {user_email}")
-            print(f"\nPassword Hash: {password_hash}")
-            print(f"\nHash Length: {len(password_hash) if password_hash else 0} characters")
-            print(f"\nHash Format: {'pbkdf2:sha256' if password_hash and password_hash.startswith('pbkdf2:sha256') else 'Unknown'}")
+            is_pbkdf2 = _print_hash_row(user_email, password_hash)
             print("=" * 70)
             
             # Verify it's a hash and not plain text
-            if password_hash and password_hash.startswith('pbkdf2:sha256:'):
+            if is_pbkdf2:
                 print("\n✓ Password is properly hashed (starts with 'pbkdf2:sha256:')")
             elif password_hash and len(password_hash) > 50:
                 print("\n⚠ Password appears to be hashed (long string), but format is unexpected")
@@ -56,29 +76,9 @@ def verify_password_hash():
             print("\nShowing password hash for first available user instead:")
             print("-" * 70)
             
-            # Query for first user
-            if USE_POSTGRES:
-                query = "SELECT email, password_hash FROM users ORDER BY email LIMIT 1"
-                cursor.execute(query)
-            else:
-                query = "SELECT email, password_hash FROM users ORDER BY email LIMIT 1"
-                cursor.execute(query)
-            
-            first_user = cursor.fetchone()
-            if first_user:
-                if isinstance(first_user, dict):
-                    user_email = first_user.get('email')
-                    password_hash = first_user.get('password_hash')
-                else:
-                    user_email = first_user[0]
-                    password_hash = first_user[1]
-                
-                print(f"Email: {user_email}")
-                print(f"\nPassword Hash: {password_hash}")
-                print(f"\nHash Length: {len(password_hash) if password_hash else 0} characters")
-                print(f"\nHash Format: {'pbkdf2:sha256' if password_hash and password_hash.startswith('pbkdf2:sha256') else 'Unknown'}")
-                
-                if password_hash and password_hash.startswith('pbkdf2:sha256:'):
+            # The query already fell back to the first user
+            if result is not None:
+                if _print_hash_row(user_email, password_hash):
                     print("\n✓ Password is properly hashed (starts with 'pbkdf2:sha256:')")
                 else:
                     print("\n⚠ Password format unexpected")